@@ -0,0 +1,40 @@
+"""Baseline files: fingerprints of accepted comments, so CI only fails on new ones.
+
+    python main.py --write-baseline overseer-baseline.json
+    python main.py --baseline overseer-baseline.json --format counts
+
+A baseline is JSON with one fingerprint (records.fingerprint) per line, sorted,
+so regenerating it after fixing comments gives a readable diff.
+"""
+
+import json
+from typing import Iterable, Set
+
+from records import Comment
+
+BASELINE_VERSION = 1
+
+
+def write_baseline(path: str, comments: Iterable[Comment]) -> int:
+    """Write the fingerprints of comments to path; return how many were written."""
+    fingerprints = sorted({comment.fingerprint for comment in comments})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": BASELINE_VERSION, "fingerprints": fingerprints}, f, indent=1
+        )
+        f.write("\n")
+    return len(fingerprints)
+
+
+def load_baseline(path: str) -> Set[str]:
+    with open(path, encoding="utf-8") as f:
+        try:
+            baseline = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} is not a baseline file: {e}") from None
+    if not isinstance(baseline, dict) or baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(
+            f"{path} is not a version {BASELINE_VERSION} baseline; "
+            "write it again with --write-baseline"
+        )
+    return set(baseline["fingerprints"])
@@ -0,0 +1,94 @@
+"""Start-up time budget check for the overseer CLI.
+
+Runs `main.py --help` and a scan of a tiny workspace several times in fresh
+interpreters and fails (exit status 1) if the fastest run exceeds its budget or
+if a heavy optional dependency was imported when it is not needed.
+
+    python benchmarks/startup.py [--runs 5] [--help-budget 0.25] [--scan-budget 0.6]
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+# Modules that must not be imported by the given command
+FORBIDDEN_IMPORTS = {
+    "help": {"pandas", "fpdf", "rich", "pathspec"},
+    "scan": {"pandas", "fpdf"},
+}
+
+
+def make_workspace(root: Path, files: int = 20) -> None:
+    for i in range(files):
+        (root / f"module_{i}.py").write_text(
+            f"def f{i}():\n    # TODO item {i}\n    return {i}\n", encoding="utf-8"
+        )
+
+
+def imported_modules(args) -> set:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MAIN), *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+
+def best_time(args, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(MAIN), *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--help-budget", type=float, default=0.25, help="Seconds")
+    parser.add_argument("--scan-budget", type=float, default=0.6, help="Seconds")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as workspace:
+        make_workspace(Path(workspace))
+        commands = {
+            "help": (["--help"], args.help_budget),
+            "scan": (["-w", workspace, "--no-cache", "--no-context"], args.scan_budget),
+        }
+        for name, (command, budget) in commands.items():
+            elapsed = best_time(command, args.runs)
+            status = "ok" if elapsed <= budget else "OVER BUDGET"
+            print(
+                f"{name:>5}: {elapsed * 1000:7.1f} ms (budget {budget * 1000:.0f} ms) {status}"
+            )
+            if elapsed > budget:
+                failures.append(name)
+
+            unexpected = imported_modules(command) & FORBIDDEN_IMPORTS[name]
+            if unexpected:
+                print(f"{name:>5}: imported {', '.join(sorted(unexpected))}")
+                failures.append(name)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Per-stage throughput benchmark on a synthetic workspace.
+
+Generates a workspace (see synthetic.py), then times discovery, scanning (cold
+and with a warm cache), context building, Rich rendering, PDF export and XLSX
+export separately. Results are written as JSON so runs can be compared across
+commits:
+
+    python benchmarks/suite.py --files 2000 --output bench.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from main import CommentScanner  # noqa: E402
+from synthetic import WorkspaceGenerator, WorkspaceSpec, parse_mix  # noqa: E402
+
+
+def measure(name, func, files: int, size: int, repeat: int):
+    """Run func repeat times and report the fastest run as throughput numbers."""
+    best = float("inf")
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func()
+        best = min(best, time.perf_counter() - start)
+    result = {
+        "seconds": round(best, 6),
+        "files": files,
+        "bytes": size,
+        "items": items,
+        "files_per_s": round(files / best, 1) if best else None,
+        "mb_per_s": round(size / best / 1e6, 3) if best else None,
+        "items_per_s": round(items / best, 1) if best else None,
+    }
+    print(
+        f"{name:>12}: {best * 1000:9.1f} ms  {result['files_per_s'] or 0:>10.1f} files/s"
+        f"  {result['mb_per_s'] or 0:>8.2f} MB/s  {items} items"
+    )
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "-C", str(ROOT), "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, workspace: Path):
+    spec = WorkspaceSpec(
+        files=args.files,
+        mix=parse_mix(args.mix),
+        file_size=args.file_size,
+        marker_density=args.marker_density,
+        line_length=args.line_length,
+        gitignore_depth=args.gitignore_depth,
+        seed=args.seed,
+    )
+    totals = WorkspaceGenerator(spec).generate(workspace)
+    files, size = totals["files"], totals["bytes"]
+    stages = {}
+
+    def make_scanner(**kwargs):
+        from rich.console import Console
+
+        scanner = CommentScanner(str(workspace), jobs=args.jobs, **kwargs)
+        scanner.console = Console(file=io.StringIO(), width=200)
+        return scanner
+
+    scanner = make_scanner()
+    stages["discovery"] = measure(
+        "discovery",
+        lambda: sum(1 for _ in scanner.iter_files()),
+        files,
+        size,
+        args.repeat,
+    )
+    stages["scan"] = measure(
+        "scan",
+        lambda: sum(1 for _ in scanner.iter_comments()),
+        files,
+        size,
+        args.repeat,
+    )
+
+    cache_dir = workspace.parent / "cache"
+    cached = make_scanner(use_cache=True, cache_dir=str(cache_dir))
+    sum(1 for _ in cached.iter_comments())  # Warm the cache
+    stages["scan_cached"] = measure(
+        "scan_cached",
+        lambda: sum(1 for _ in cached.iter_comments()),
+        files,
+        size,
+        args.repeat,
+    )
+
+    comments = list(scanner.iter_comments())
+
+    def build_context():
+        renderer = make_scanner()  # Fresh line-index cache on every run
+        for comment in comments:
+            renderer.get_context(comment)
+        return len(comments)
+
+    stages["context"] = measure("context", build_context, files, size, args.repeat)
+
+    def render():
+        make_scanner().display_comments(comments)
+        return len(comments)
+
+    stages["render"] = measure("render", render, files, size, args.repeat)
+
+    export_comments = comments[: args.export_limit]
+
+    def export_pdf():
+        make_scanner().export_to_pdf(export_comments, str(workspace.parent / "out.pdf"))
+        return len(export_comments)
+
+    def export_xlsx():
+        make_scanner().export_to_excel(
+            export_comments, str(workspace.parent / "out.xlsx")
+        )
+        return len(export_comments)
+
+    if not args.skip_exports:
+        stages["export_pdf"] = measure("export_pdf", export_pdf, files, size, 1)
+        stages["export_xlsx"] = measure("export_xlsx", export_xlsx, files, size, 1)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "spec": {
+                key: getattr(spec, key)
+                for key in (
+                    "files",
+                    "mix",
+                    "file_size",
+                    "marker_density",
+                    "line_length",
+                    "gitignore_depth",
+                    "seed",
+                )
+            },
+            "jobs": args.jobs,
+            "comments": len(comments),
+            "export_limit": args.export_limit,
+        },
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overseer per-stage benchmark")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--mix", default="", help="e.g. py=2,js=1 (default: all)")
+    parser.add_argument("--file-size", type=int, default=4096)
+    parser.add_argument("--marker-density", type=float, default=0.02)
+    parser.add_argument("--line-length", type=int, default=60)
+    parser.add_argument("--gitignore-depth", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--export-limit",
+        type=int,
+        default=2000,
+        help="Comments passed to the PDF/XLSX exporters",
+    )
+    parser.add_argument("--skip-exports", action="store_true")
+    parser.add_argument("--output", "-o", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(args, Path(tmp) / "workspace")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
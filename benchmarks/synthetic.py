@@ -0,0 +1,166 @@
+"""Reproducible synthetic workspaces for benchmarking the scanner.
+
+python benchmarks/synthetic.py /tmp/bench-ws --files 5000 --mix py=2,js=1,c=1
+"""
+
+import argparse
+import random
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+
+# Words used for code and comment bodies
+WORDS = (
+    "value result index buffer config handler request response cache token "
+    "parser worker stream record offset length schema filter"
+).split()
+
+
+def scannable_extensions():
+    """Extensions that are both discovered (FILE_PATTERNS) and parsed (COMMENT_PATTERNS)."""
+    discovered = {pattern[2:] for pattern in config.FILE_PATTERNS}
+    return sorted(ext for ext in config.COMMENT_PATTERNS if ext in discovered)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "py=2,js=1" into weights; an empty string weighs all languages equally."""
+    if not mix:
+        return {ext: 1.0 for ext in scannable_extensions()}
+    weights = {}
+    for item in mix.split(","):
+        ext, _, weight = item.partition("=")
+        if ext not in config.COMMENT_PATTERNS:
+            raise ValueError(f"No comment patterns configured for '{ext}'")
+        weights[ext] = float(weight or 1)
+    return weights
+
+
+@dataclass
+class WorkspaceSpec:
+    files: int = 1000
+    # Extension -> relative weight
+    mix: Dict[str, float] = field(default_factory=lambda: parse_mix(""))
+    # Average file size in bytes
+    file_size: int = 4096
+    # Fraction of lines that are marked comments
+    marker_density: float = 0.02
+    line_length: int = 60
+    # Nesting depth of the directory tree; every level also holds a gitignored
+    # directory so pruning is exercised at each depth
+    gitignore_depth: int = 3
+    # Files per directory before a new one is started
+    files_per_dir: int = 50
+    seed: int = 0
+
+
+class WorkspaceGenerator:
+    def __init__(self, spec: WorkspaceSpec):
+        self.spec = spec
+        self.rnd = random.Random(spec.seed)
+        self.markers = list(config.COMMENT_MARKERS)
+
+    def generate(self, root: Path) -> Dict[str, int]:
+        """Write the workspace under root and return file and byte counts."""
+        spec = self.spec
+        root.mkdir(parents=True, exist_ok=True)
+        # Generated files live gitignore_depth + 1 levels down (see _directory)
+        ignored = [f"ignored_{depth}/" for depth in range(spec.gitignore_depth + 2)]
+        (root / ".gitignore").write_text(
+            "\n".join(["# generated", "*.tmp", *ignored]) + "\n", encoding="utf-8"
+        )
+
+        extensions = list(spec.mix)
+        weights = [spec.mix[ext] for ext in extensions]
+        totals = {"files": 0, "bytes": 0, "ignored_files": 0}
+        for index in range(spec.files):
+            directory = self._directory(root, index // spec.files_per_dir)
+            ext = self.rnd.choices(extensions, weights)[0]
+            data = self._file_content(ext).encode("utf-8")
+            (directory / f"file_{index}.{ext}").write_bytes(data)
+            totals["files"] += 1
+            totals["bytes"] += len(data)
+
+            # Files the walker must never see
+            if index % spec.files_per_dir == 0:
+                depth = len(directory.relative_to(root).parts)
+                ignored_dir = directory / f"ignored_{depth}"
+                ignored_dir.mkdir(exist_ok=True)
+                (ignored_dir / f"skipped_{index}.{ext}").write_bytes(data)
+                totals["ignored_files"] += 1
+        return totals
+
+    def _directory(self, root: Path, bucket: int) -> Path:
+        parts = []
+        for depth in range(self.spec.gitignore_depth):
+            parts.append(f"d{depth}_{bucket % (depth + 3)}")
+        directory = root.joinpath(*parts, f"pkg_{bucket}")
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def _code_line(self) -> str:
+        words = []
+        length = 0
+        while length < self.spec.line_length:
+            word = self.rnd.choice(WORDS)
+            words.append(word)
+            length += len(word) + 3
+        return "    " + " = ".join(words[:2]) + "(" + ", ".join(words[2:]) + ")"
+
+    def _comment_line(self, patterns: Dict) -> str:
+        marker = self.rnd.choice(self.markers)
+        text = " ".join(self.rnd.choices(WORDS, k=6))
+        multiline = patterns.get("multiline")
+        if multiline and self.rnd.random() < 0.25:
+            start, end = multiline
+            return f"{start} {marker} {text}\n{text}\n{end}"
+        return f"{self.rnd.choice(patterns['single'])} {marker} {text}"
+
+    def _file_content(self, ext: str) -> str:
+        patterns = config.COMMENT_PATTERNS[ext]
+        target = max(
+            1, int(self.rnd.gauss(self.spec.file_size, self.spec.file_size / 4))
+        )
+        lines = []
+        size = 0
+        while size < target:
+            if self.rnd.random() < self.spec.marker_density:
+                line = self._comment_line(patterns)
+            else:
+                line = self._code_line()
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic workspace")
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--mix", default="", help="e.g. py=2,js=1 (default: all)")
+    parser.add_argument("--file-size", type=int, default=4096)
+    parser.add_argument("--marker-density", type=float, default=0.02)
+    parser.add_argument("--line-length", type=int, default=60)
+    parser.add_argument("--gitignore-depth", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = WorkspaceSpec(
+        files=args.files,
+        mix=parse_mix(args.mix),
+        file_size=args.file_size,
+        marker_density=args.marker_density,
+        line_length=args.line_length,
+        gitignore_depth=args.gitignore_depth,
+        seed=args.seed,
+    )
+    totals = WorkspaceGenerator(spec).generate(args.root)
+    print(f"{totals['files']} files, {totals['bytes']} bytes written to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+
+# Bump whenever the shape of the cached rows changes
+CACHE_VERSION = 4
+
+
+def config_fingerprint() -> str:
+    """Hash of every setting that influences what scan_file extracts."""
+    payload = json.dumps(
+        [
+            CACHE_VERSION,
+            config.COMMENT_PATTERNS,
+            list(config.COMMENT_MARKERS),
+        ],
+        sort_keys=True,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def content_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class ScanCache:
+    """On-disk map of relative path -> (mtime_ns, size, digest, fingerprint, rows).
+
+    Rows hold every marker found in a file, so changing the skipped markers never
+    invalidates the cache. Files without markers are stored with a NULL payload.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Keep the cache out of version control without touching the project's .gitignore
+        ignore_file = self.cache_dir / ".gitignore"
+        if not ignore_file.exists():
+            ignore_file.write_text("*\n", encoding="utf-8")
+
+        self.fingerprint = config_fingerprint()
+        self.conn = sqlite3.connect(self.cache_dir / "scan.sqlite3", timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                digest BLOB NOT NULL,
+                fingerprint TEXT NOT NULL,
+                comments TEXT
+            )
+            """)
+        # One query up front is far cheaper than a lookup per file
+        self._entries: Dict[str, Tuple[int, int, bytes, Optional[str]]] = {
+            path: (mtime_ns, size, digest, comments)
+            for path, mtime_ns, size, digest, comments in self.conn.execute(
+                "SELECT path, mtime_ns, size, digest, comments FROM files "
+                "WHERE fingerprint = ?",
+                (self.fingerprint,),
+            )
+        }
+        self._pending: List[Tuple] = []
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self, rel_path: str, st: os.stat_result
+    ) -> Tuple[Optional[List[Tuple]], Optional[bytes]]:
+        """Return (rows, None) on a hit.
+
+        When only the mtime changed, (None, digest) is returned so the caller can
+        confirm the content hash before reusing the entry via rows_for().
+        """
+        entry = self._entries.get(rel_path)
+        if entry is None or entry[1] != st.st_size:
+            return None, None
+        if entry[0] != st.st_mtime_ns:
+            return None, entry[2]
+        self.hits += 1
+        return self.rows_for(rel_path), None
+
+    def rows_for(self, rel_path: str) -> List[Tuple]:
+        comments = self._entries[rel_path][3]
+        if comments is None:
+            return []
+        return [tuple(row) for row in json.loads(comments)]
+
+    def store(
+        self,
+        rel_path: str,
+        st: os.stat_result,
+        digest: bytes,
+        rows: List[Tuple],
+        reused: bool = False,
+    ) -> None:
+        if reused:
+            self.hits += 1
+        else:
+            self.misses += 1
+        comments = json.dumps(rows, ensure_ascii=False) if rows else None
+        self._entries[rel_path] = (st.st_mtime_ns, st.st_size, digest, comments)
+        self._pending.append(
+            (rel_path, st.st_mtime_ns, st.st_size, digest, self.fingerprint, comments)
+        )
+        if len(self._pending) >= 1000:
+            self._flush()
+
+    def prune(self, seen_paths: Iterable[str]) -> None:
+        """Forget files that no longer exist in the workspace."""
+        stale = set(self._entries).difference(seen_paths)
+        for rel_path in stale:
+            del self._entries[rel_path]
+        self.conn.executemany(
+            "DELETE FROM files WHERE path = ?", ((path,) for path in stale)
+        )
+        self.conn.execute(
+            "DELETE FROM files WHERE fingerprint != ?", (self.fingerprint,)
+        )
+
+    def _flush(self) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", self._pending
+        )
+        self._pending = []
+
+    def close(self) -> None:
+        self._flush()
+        self.conn.commit()
+        self.conn.close()
+
+
+class GitBlobCache(ScanCache):
+    """ScanCache that also reuses results by git blob ID.
+
+    A tracked file that is clean in the working tree has the content of its
+    index blob, so results stored under (blob ID, extension, fingerprint) apply
+    to any checkout of that content: other branches, worktrees, or CI runners
+    sharing the cache directory. Such files are neither opened nor hashed.
+    Dirty, untracked and symlinked files fall back to the stat/hash cache.
+
+    prune() only forgets path entries: blob rows are shared with other checkouts.
+    Instead, each blob row records the day it was last used, and close() drops
+    the least recently used rows beyond GIT_BLOB_CACHE_MAX_ENTRIES, so the table
+    stays bounded as new commits create new blobs.
+    """
+
+    def __init__(self, cache_dir: Path, workspace_path: Path):
+        from vcs import run_git
+
+        super().__init__(cache_dir)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(blobs)")]
+        if columns and "used" not in columns:
+            # Written before rows recorded their last use; it is only a cache
+            self.conn.execute("DROP TABLE blobs")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                blob TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                comments TEXT,
+                used INTEGER NOT NULL,
+                PRIMARY KEY (blob, ext, fingerprint)
+            )
+            """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS blobs_used ON blobs (used)")
+        # Days since the epoch: a row is rewritten at most once a day when used
+        self.today = int(time.time() // 86400)
+        # Relative path -> blob ID, for regular files whose index entry is clean
+        self.blob_ids: Dict[str, str] = {}
+        listing = run_git(workspace_path, "ls-files", "-s", "-z")
+        for record in listing.split(b"\0"):
+            if not record:
+                continue
+            info, _, path = record.partition(b"\t")
+            mode, blob, stage = info.split(b" ")
+            # Symlinks and submodules hold no file content; stage > 0 is a conflict
+            if stage == b"0" and mode in (b"100644", b"100755"):
+                self.blob_ids[os.fsdecode(path).replace("/", os.sep)] = blob.decode()
+        dirty = run_git(workspace_path, "diff-files", "--name-only", "-z", "--relative")
+        for path in dirty.split(b"\0"):
+            self.blob_ids.pop(os.fsdecode(path).replace("/", os.sep), None)
+
+        self._blobs: Dict[Tuple[str, str], Tuple[int, Optional[str], int]] = {
+            (blob, ext): (size, comments, used)
+            for blob, ext, size, comments, used in self.conn.execute(
+                "SELECT blob, ext, size, comments, used FROM blobs "
+                "WHERE fingerprint = ?",
+                (self.fingerprint,),
+            )
+        }
+        self._pending_blobs: List[Tuple] = []
+        self._used_blobs: List[Tuple] = []
+
+    def lookup(
+        self, rel_path: str, st: os.stat_result
+    ) -> Tuple[Optional[List[Tuple]], Optional[bytes]]:
+        blob = self.blob_ids.get(rel_path)
+        if blob is not None:
+            entry = self._blobs.get((blob, os.path.splitext(rel_path)[1]))
+            # The size guards against checkout filters (eol conversion, LFS)
+            # making the working tree differ from the blob
+            if entry is not None and entry[0] == st.st_size:
+                self.hits += 1
+                size, comments, used = entry
+                if used != self.today:
+                    key = (blob, os.path.splitext(rel_path)[1])
+                    self._blobs[key] = (size, comments, self.today)
+                    self._used_blobs.append((self.today, *key, self.fingerprint))
+                return (
+                    []
+                    if comments is None
+                    else [tuple(row) for row in json.loads(comments)]
+                ), None
+        return super().lookup(rel_path, st)
+
+    def store(
+        self,
+        rel_path: str,
+        st: os.stat_result,
+        digest: bytes,
+        rows: List[Tuple],
+        reused: bool = False,
+    ) -> None:
+        super().store(rel_path, st, digest, rows, reused)
+        blob = self.blob_ids.get(rel_path)
+        if blob is None:
+            return
+        ext = os.path.splitext(rel_path)[1]
+        comments = json.dumps(rows, ensure_ascii=False) if rows else None
+        self._blobs[(blob, ext)] = (st.st_size, comments, self.today)
+        self._pending_blobs.append(
+            (blob, ext, self.fingerprint, st.st_size, comments, self.today)
+        )
+
+    def _flush(self) -> None:
+        super()._flush()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+            self._pending_blobs,
+        )
+        self._pending_blobs = []
+        self.conn.executemany(
+            "UPDATE blobs SET used = ? WHERE blob = ? AND ext = ? AND fingerprint = ?",
+            self._used_blobs,
+        )
+        self._used_blobs = []
+
+    def close(self) -> None:
+        self._flush()
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()
+        excess = count - config.GIT_BLOB_CACHE_MAX_ENTRIES
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM blobs WHERE rowid IN "
+                "(SELECT rowid FROM blobs ORDER BY used LIMIT ?)",
+                (excess,),
+            )
+        super().close()
+
+
+# Rough per-entry and per-row costs of MemoryCache entries (tuples, ints, digest)
+_ENTRY_OVERHEAD = 250
+_ROW_OVERHEAD = 150
+
+
+class MemoryCache(ScanCache):
+    """ScanCache kept in process memory only, for long-running processes.
+
+    Rows are held as tuples rather than JSON, and close() keeps them, so the same
+    instance can back every scan of a workspace. memory is a rough estimate of
+    the bytes held, used to enforce memory caps.
+    """
+
+    def __init__(self):
+        self.fingerprint = config_fingerprint()
+        self._entries: Dict[str, Tuple[int, int, bytes, List[Tuple]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.memory = 0
+
+    def rows_for(self, rel_path: str) -> List[Tuple]:
+        return self._entries[rel_path][3]
+
+    def store(
+        self,
+        rel_path: str,
+        st: os.stat_result,
+        digest: bytes,
+        rows: List[Tuple],
+        reused: bool = False,
+    ) -> None:
+        if reused:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._forget(rel_path)
+        self._entries[rel_path] = (st.st_mtime_ns, st.st_size, digest, rows)
+        self.memory += self._entry_size(rel_path, rows)
+
+    def prune(self, seen_paths: Iterable[str]) -> None:
+        for rel_path in set(self._entries).difference(seen_paths):
+            self._forget(rel_path)
+
+    def close(self) -> None:
+        pass
+
+    def _forget(self, rel_path: str) -> None:
+        entry = self._entries.pop(rel_path, None)
+        if entry is not None:
+            self.memory -= self._entry_size(rel_path, entry[3])
+
+    @staticmethod
+    def _entry_size(rel_path: str, rows: List[Tuple]) -> int:
+        return (
+            _ENTRY_OVERHEAD
+            + len(rel_path)
+            + sum(_ROW_OVERHEAD + len(row[1]) for row in rows)
+        )
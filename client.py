@@ -0,0 +1,126 @@
+"""Thin client for the scan daemon (`main.py serve`).
+
+Rich, pandas and pathspec are never imported (main is, for its argument
+helpers, but it loads those lazily), so a query costs little more than
+interpreter start-up:
+
+    python main.py query -w /path/to/project --skip NOTE
+    python client.py -w /path/to/project --format jsonl
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Dict, Iterator
+
+import config
+from main import _silence_broken_pipe, add_filter_arguments, check_filter_arguments
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "overseer.sock")
+    return f"/tmp/overseer-{os.getuid()}.sock"
+
+
+def request(socket_path: str, payload: Dict) -> Iterator[Dict]:
+    """Send one request and yield the daemon's JSON responses as they arrive."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as responses:
+            for line in responses:
+                yield json.loads(line)
+
+
+def _print_text(comment: Dict) -> None:
+    print(f"{comment['file']}:{comment['line']}: {comment['type']}: {comment['text']}")
+    if comment.get("context"):
+        for line in comment["context"].split("\n"):
+            print(f"    {line}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="main.py query",
+        description="Query a running overseer daemon (start one with main.py serve)",
+    )
+    parser.add_argument(
+        "--workspace", "-w", type=str, help="Path to the workspace directory"
+    )
+    add_filter_arguments(parser)
+    parser.add_argument(
+        "--no-context",
+        "-nc",
+        action="store_true",
+        help="Don't show context lines around comments",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "jsonl"],
+        default="text",
+        help="text prints file:line: marker: text, jsonl one JSON object per comment",
+    )
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="Daemon socket (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        help="Print the workspaces the daemon holds instead of querying",
+    )
+    parser.add_argument("--stop", action="store_true", help="Stop the daemon")
+    args = parser.parse_args(argv)
+
+    check_filter_arguments(parser, args)
+
+    if args.status:
+        payload = {"op": "status"}
+    elif args.stop:
+        payload = {"op": "stop"}
+    else:
+        payload = {
+            "op": "query",
+            # The daemon runs in another directory, so send an absolute path
+            "workspace": os.path.abspath(args.workspace or config.DEFAULT_WORKSPACE),
+            "skip": [] if args.include_all else args.skip,
+            "context": not args.no_context,
+            "filename": args.filename,
+            "case_sensitive": args.case_sensitive,
+            "complete_match": args.complete_match,
+        }
+
+    try:
+        for response in request(args.socket, payload):
+            if "comment" in response:
+                if args.format == "jsonl":
+                    print(json.dumps(response["comment"], ensure_ascii=False))
+                else:
+                    _print_text(response["comment"])
+            elif "error" in response:
+                print(f"Error: {response['error']}", file=sys.stderr)
+                return 1
+            elif "done" in response:
+                for message in response["done"].get("errors", []):
+                    print(f"Error scanning {message}", file=sys.stderr)
+                if args.status or args.stop:
+                    print(json.dumps(response["done"], indent=2))
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(
+            f"No overseer daemon is listening on {args.socket}; "
+            "start one with `main.py serve`",
+            file=sys.stderr,
+        )
+        return 2
+    except BrokenPipeError:
+        _silence_broken_pipe()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -34,16 +34,6 @@ FILE_PATTERNS = [
     "*.less",
     "*.styl",
     "*.stylus",
-    "*.scss",
-    "*.sass",
-    "*.less",
-    "*.styl",
-    "*.stylus",
-    "*.scss",
-    "*.sass",
-    "*.less",
-    "*.styl",
-    "*.stylus",
 ]
 
 # Comment markers and their descriptions
@@ -72,9 +62,20 @@ DEFAULT_EXCLUDES = {"node_modules", "__pycache__", "build", "dist"}
 # Default settings
 DEFAULT_SKIP_MARKERS = {"NOTE"}  # Skip NOTE comments by default
 CONTEXT_LINES = 2  # Number of lines before and after to show
+CONTEXT_CACHE_SIZE = 64  # Files whose line index is kept for rendering context
+SCAN_BATCH_SIZE = 64  # Files sent to a worker process at a time with --jobs
+CACHE_DIR = ".overseer-cache"  # Incremental scan cache, relative to the workspace
+CACHE_BACKENDS = ["auto", "stat", "git"]  # auto: git inside a work tree, else stat
+GIT_BLOB_CACHE_MAX_ENTRIES = 200_000  # Blob results kept; least recently used go first
+SLOW_FILES_SHOWN = 10  # Slowest files listed by --stats
+DAEMON_MEMORY_CAP_MB = 512  # Indexes `main.py serve` keeps before evicting idle workspaces
+DAEMON_REFRESH_INTERVAL = 2.0  # Seconds a daemon index is served before it is rescanned
+WATCH_DEBOUNCE = 0.2  # --watch waits for this many quiet seconds before rescanning
+WATCH_POLL_INTERVAL = 1.0  # Seconds between scans when --watch can't use inotify
 
 # Output formats
 EXPORT_FORMATS = ["pdf", "xlsx"]  # Supported export formats
+OUTPUT_FORMATS = ["table", "jsonl", "counts"]  # Console output formats (--format)
 
 COMMENT_PATTERNS = {
     # Default pattern (for unknown extensions)
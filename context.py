@@ -0,0 +1,25 @@
+from array import array
+from itertools import accumulate
+
+from matcher import decode_line, normalize_newlines
+
+
+class LineIndex:
+    """Byte offsets of every line start in a file, giving random access to lines.
+
+    Behaves like a read-only list of lines; a line is only decoded when it is
+    accessed, so building context never decodes the rest of the file.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = normalize_newlines(data)
+        self.starts = array(
+            "q",
+            accumulate((len(line) + 1 for line in self.data.split(b"\n")), initial=0),
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return decode_line(self.data[self.starts[index] : self.starts[index + 1] - 1])
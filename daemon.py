@@ -0,0 +1,322 @@
+"""Scan daemon: warm per-workspace indexes answering queries over a Unix socket.
+
+    python main.py serve --memory-cap 1024 &
+    python main.py query -w /path/to/project -f api.ts
+
+Each workspace gets a CommentScanner backed by a MemoryCache. A query rescans
+its workspace when the index is older than --refresh-interval, which only
+re-reads files whose size or mtime changed. Filters are applied per query on the
+complete index. When the estimated size of all indexes exceeds the memory cap,
+the least recently queried workspaces are dropped.
+
+Protocol: the client sends one JSON object per connection, terminated by a
+newline; the daemon answers with one JSON object per line ({"comment": ...}
+records, then {"done": ...} or {"error": ...}).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import config
+from cache import MemoryCache
+from client import default_socket_path
+from main import CommentScanner
+
+# Rough cost of one Comment held by an index, on top of its text
+_COMMENT_OVERHEAD = 100
+
+# Worker processes are started from a clean server process, never forked from
+# the multithreaded daemon
+_WORKER_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class WorkspaceIndex:
+    """Every comment of one workspace, refreshed incrementally."""
+
+    def __init__(self, workspace_path: Path, jobs: int):
+        self.scanner = CommentScanner(
+            str(workspace_path), jobs=jobs, cache=MemoryCache()
+        )
+        # Every marker is kept; skip lists are applied per query
+        self.scanner.skip_markers = frozenset()
+        # Forking while other handler threads hold locks can deadlock the workers
+        self.scanner.mp_context = _WORKER_CONTEXT
+        self.comments = []
+        self.errors: List[str] = []
+        self.lock = threading.Lock()
+        self.refreshed_at: Optional[float] = None
+        self.gitignore_mtime = self._gitignore_mtime()
+        # Estimated bytes held, updated under lock so eviction never has to walk
+        # scanner state that a query on another thread may be changing
+        self.memory = 0
+
+    def _gitignore_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.scanner.workspace_path / ".gitignore").st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, max_age: float) -> bool:
+        """Rescan unless the index is younger than max_age seconds; call with lock held."""
+        if (
+            self.refreshed_at is not None
+            and time.monotonic() - self.refreshed_at < max_age
+        ):
+            return False
+        scanner = self.scanner
+        gitignore_mtime = self._gitignore_mtime()
+        if gitignore_mtime != self.gitignore_mtime:
+            scanner.exclude_patterns = scanner._load_gitignore()
+            self.gitignore_mtime = gitignore_mtime
+
+        errors = []
+        self.comments = list(
+            scanner.iter_comments(
+                on_error=lambda path, message: errors.append(f"{path}: {message}")
+            )
+        )
+        self.errors = errors
+        # Lines of changed files must be read again for context
+        scanner._line_indexes.clear()
+        self.refreshed_at = time.monotonic()
+        return True
+
+    def update_memory(self) -> None:
+        """Re-estimate the bytes held by this index; call with lock held."""
+        scanner = self.scanner
+        self.memory = (
+            scanner.cache.memory
+            + _COMMENT_OVERHEAD * len(self.comments)
+            + sum(len(index.data) for index in scanner._line_indexes.values())
+        )
+
+    def query(self, request: Dict) -> Iterator[Dict]:
+        """Yield the comments matching the CLI-style filters in request; call with lock held."""
+        scanner = self.scanner
+        # Same defaulting as the CLI: no skip list means the default markers, an
+        # empty one (--include-all) skips nothing
+        skip = request.get("skip")
+        skip_markers = config.DEFAULT_SKIP_MARKERS if skip is None else set(skip)
+        filename_filter = request.get("filename")
+        case_sensitive = bool(request.get("case_sensitive"))
+        complete_match = bool(request.get("complete_match"))
+        scanner.show_context = bool(request.get("context", True))
+
+        file_matches: Dict[int, bool] = {}
+        for comment in self.comments:
+            if comment.type in skip_markers:
+                continue
+            if filename_filter:
+                matches = file_matches.get(comment.file_id)
+                if matches is None:
+                    matches = file_matches[comment.file_id] = scanner._matches_filename(
+                        os.path.basename(comment.file),
+                        filename_filter,
+                        case_sensitive,
+                        complete_match,
+                    )
+                if not matches:
+                    continue
+            record = comment.as_dict()
+            if scanner.show_context:
+                record["context"] = scanner.get_context(comment)
+            yield record
+
+
+class ScanDaemon:
+    def __init__(self, jobs: int, memory_cap: int, refresh_interval: float):
+        self.jobs = jobs
+        self.memory_cap = memory_cap
+        self.refresh_interval = refresh_interval
+        # Workspace path -> index, least recently queried first
+        self.indexes: "OrderedDict[Path, WorkspaceIndex]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _index(self, workspace: str) -> WorkspaceIndex:
+        path = Path(workspace).resolve()
+        if not path.is_dir():
+            raise ValueError(f"Workspace {workspace} is not a directory")
+        with self.lock:
+            index = self.indexes.get(path)
+            if index is None:
+                index = self.indexes[path] = WorkspaceIndex(path, self.jobs)
+            self.indexes.move_to_end(path)
+            return index
+
+    def _evict(self) -> None:
+        """Drop least recently queried indexes until the rest fit the memory cap."""
+        with self.lock:
+            total = sum(index.memory for index in self.indexes.values())
+            # The most recently queried workspace is always kept
+            while total > self.memory_cap and len(self.indexes) > 1:
+                _, index = self.indexes.popitem(last=False)
+                total -= index.memory
+
+    def handle(self, request: Dict) -> Iterator[Dict]:
+        op = request.get("op", "query")
+        if op == "status":
+            with self.lock:
+                indexes = list(self.indexes.items())
+            yield {
+                "done": {
+                    "memory_cap": self.memory_cap,
+                    "workspaces": [
+                        {
+                            "workspace": str(path),
+                            "comments": len(index.comments),
+                            "files": len(index.scanner.cache._entries),
+                            "memory": index.memory,
+                        }
+                        for path, index in indexes
+                    ],
+                }
+            }
+            return
+        if op == "stop":
+            yield {"done": {"stopping": True}}
+            return
+        if op != "query":
+            yield {"error": f"Unknown op {op!r}"}
+            return
+
+        index = self._index(request.get("workspace") or str(config.DEFAULT_WORKSPACE))
+        # Results are collected before any is written, so a slow client never
+        # holds the lock other queries on the workspace are waiting for
+        with index.lock:
+            try:
+                start = time.perf_counter()
+                refreshed = index.refresh(self.refresh_interval)
+                refresh_seconds = time.perf_counter() - start
+                records = list(index.query(request))
+                errors = index.errors
+            finally:
+                # Rendering context loaded line indexes
+                index.update_memory()
+        self._evict()
+        for record in records:
+            yield {"comment": record}
+        yield {
+            "done": {
+                "count": len(records),
+                "refreshed": refreshed,
+                "refresh_seconds": round(refresh_seconds, 6),
+                "errors": errors,
+            }
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon: ScanDaemon = self.server.daemon
+        try:
+            request = json.loads(self.rfile.readline())
+            responses = daemon.handle(request)
+            for response in responses:
+                self.wfile.write(
+                    json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+                )
+        except (BrokenPipeError, ConnectionResetError):
+            return  # The client went away
+        except Exception as e:
+            self.wfile.write(json.dumps({"error": str(e)}).encode("utf-8") + b"\n")
+            return
+        if request.get("op") == "stop":
+            # Returns once serve_forever() on the main thread has stopped
+            self.server.shutdown()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove a socket left behind by a daemon that died; refuse to start twice."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+            return
+    raise SystemExit(f"An overseer daemon is already listening on {socket_path}")
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Keep workspace scans warm in memory and answer `main.py query`",
+    )
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="Unix socket to listen on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--memory-cap",
+        type=int,
+        default=config.DAEMON_MEMORY_CAP_MB,
+        metavar="MB",
+        help="Evict the least recently queried workspaces above this estimated size "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        type=float,
+        default=config.DAEMON_REFRESH_INTERVAL,
+        metavar="SECONDS",
+        help="Serve an index this long before rescanning it (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes used for scanning; refreshes only re-read "
+        "changed files, so one is usually enough (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.memory_cap < 1:
+        parser.error("--memory-cap must be at least 1")
+
+    _remove_stale_socket(args.socket)
+    # Only the owner may query the daemon
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(args.socket, _RequestHandler)
+    finally:
+        os.umask(old_umask)
+    server.daemon = ScanDaemon(
+        args.jobs, args.memory_cap * 1024 * 1024, args.refresh_interval
+    )
+    # Turn SIGTERM into a clean exit so the socket file is removed
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    print(f"Listening on {args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(args.socket)
+        except OSError:
+            pass
@@ -0,0 +1,338 @@
+"""Comments across git history, without checking out any revision.
+
+Commits, trees and blobs are read through one long-running git cat-file
+--batch. Each distinct blob is scanned once, and marker counts are memoized
+per tree, so a commit costs only the trees and blobs it changed. Paths are
+filtered with the workspace's current .gitignore and the scanner's file
+patterns.
+"""
+
+import os
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+import config
+from records import Comment, marker_names, normalize_text
+
+if TYPE_CHECKING:
+    from main import CommentScanner
+    from vcs import CatFile
+
+_TREE = b"40000"
+_FILE_MODES = (b"100644", b"100755")  # Symlinks and submodules hold no comments
+
+
+class CommitSummary:
+    """Marker counts at one commit and, optionally, what changed since its first parent."""
+
+    __slots__ = ("commit", "timestamp", "subject", "counts", "added", "removed")
+
+    def __init__(self, commit: str, timestamp: int, subject: str, counts: Dict):
+        self.commit = commit
+        self.timestamp = timestamp
+        self.subject = subject
+        self.counts: Dict[str, int] = counts
+        self.added: Optional[List[Comment]] = None
+        self.removed: Optional[List[Comment]] = None
+
+    def as_dict(self) -> Dict:
+        from datetime import datetime, timezone
+
+        record = {
+            "commit": self.commit,
+            "date": datetime.fromtimestamp(self.timestamp, timezone.utc).isoformat(),
+            "subject": self.subject,
+            "counts": self.counts,
+        }
+        if self.added is not None:
+            record["added"] = [comment.as_dict() for comment in self.added]
+            record["removed"] = [comment.as_dict() for comment in self.removed]
+        return record
+
+
+class RevisionDiff:
+    """Comments added and removed between two revisions, and those that moved.
+
+    moved holds (line in the old revision, comment in the new revision).
+    """
+
+    __slots__ = ("added", "removed", "moved")
+
+    def __init__(self):
+        self.added: List[Comment] = []
+        self.removed: List[Comment] = []
+        self.moved: List[Tuple[int, Comment]] = []
+
+
+def match_rows(
+    old_rows: List[Tuple], new_rows: List[Tuple]
+) -> Tuple[List[Tuple], List[Tuple], List[Tuple[Tuple, Tuple]]]:
+    """Split one file's rows into (added, removed, moved (old row, new row)).
+
+    Rows are identified by marker and normalized text. Rows that keep their
+    order relative to the other comments are unchanged, even if edits above
+    shifted their line; matched rows that changed places are moved.
+    """
+    old_keys = [(marker_id, normalize_text(text)) for marker_id, text, _ in old_rows]
+    new_keys = [(marker_id, normalize_text(text)) for marker_id, text, _ in new_rows]
+    kept_old, kept_new = set(), set()
+    matcher = SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for old_start, new_start, size in matcher.get_matching_blocks():
+        kept_old.update(range(old_start, old_start + size))
+        kept_new.update(range(new_start, new_start + size))
+
+    unmatched: Dict[Tuple, List[int]] = {}
+    for i in reversed(range(len(old_rows))):
+        if i not in kept_old:
+            unmatched.setdefault(old_keys[i], []).append(i)
+    added, moved = [], []
+    for j, row in enumerate(new_rows):
+        if j in kept_new:
+            continue
+        candidates = unmatched.get(new_keys[j])
+        if candidates:
+            moved.append((old_rows[candidates.pop()], row))
+        else:
+            added.append(row)
+    removed = [
+        old_rows[i] for i in sorted(i for ids in unmatched.values() for i in ids)
+    ]
+    return added, removed, moved
+
+
+class HistoryWalk:
+    """Walks the commits of a revision range, yielding a CommitSummary for each."""
+
+    def __init__(
+        self,
+        scanner: "CommentScanner",
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+        changes: bool = False,
+    ):
+        self.scanner = scanner
+        self.filename_filter = filename_filter
+        self.case_sensitive = case_sensitive
+        self.complete_match = complete_match
+        # Also list the comments added and removed by each commit
+        self.changes = changes
+        self._cat: Optional["CatFile"] = None
+        # (blob id, extension) -> rows of every marker
+        self._blob_rows: Dict[Tuple[str, str], List[Tuple]] = {}
+        # (tree id, directory) -> count per marker id
+        self._tree_counts: Dict[Tuple[str, str], List[int]] = {}
+        # Commit -> id of its workspace tree ("" if the workspace did not exist)
+        self._workspace_trees: Dict[str, str] = {}
+        self._wanted: Dict[str, bool] = {}
+        self.commits = 0
+
+    @property
+    def blobs_scanned(self) -> int:
+        return len(self._blob_rows)
+
+    def walk(self, rev_range: str) -> Iterator[CommitSummary]:
+        """Yield summaries oldest first (parents before children)."""
+        from vcs import CatFile, parse_commit, rev_list, show_prefix
+
+        workspace = self.scanner.workspace_path
+        prefix = show_prefix(workspace)
+        commits = rev_list(workspace, rev_range)
+        names = marker_names()
+        skip_markers = self.scanner.skip_markers
+        with CatFile(workspace) as self._cat:
+            for commit in commits:
+                tree, parents, timestamp, subject = parse_commit(
+                    self._read(commit, b"commit")
+                )
+                tree = self._subtree(tree, prefix)
+                self._workspace_trees[commit] = tree
+                counts = self._count(tree, "") if tree else [0] * len(names)
+                summary = CommitSummary(
+                    commit,
+                    timestamp,
+                    subject,
+                    {
+                        name: count
+                        for name, count in zip(names, counts)
+                        if name not in skip_markers
+                    },
+                )
+                if self.changes:
+                    parent_tree = ""
+                    if parents:
+                        parent_tree = self._workspace_tree(parents[0], prefix)
+                    summary.added, summary.removed = [], []
+                    for rel_path, old_rows, new_rows in self._diff(
+                        parent_tree, tree, ""
+                    ):
+                        added, removed, _ = match_rows(old_rows, new_rows)
+                        summary.added += self._comments(rel_path, added)
+                        summary.removed += self._comments(rel_path, removed)
+                self.commits += 1
+                yield summary
+        self._cat = None
+
+    def _read(self, object_id: str, kind: bytes) -> bytes:
+        from vcs import GitError
+
+        result = self._cat.read(object_id)
+        if result is None:
+            raise GitError(f"Unknown revision or object {object_id}")
+        if result[0] != kind:
+            raise GitError(f"{object_id} is not a {kind.decode()}")
+        return result[1]
+
+    def _workspace_tree(self, commit: str, prefix: str) -> str:
+        """Workspace tree of a commit outside the range walked so far (e.g. a range's base)."""
+        from vcs import parse_commit
+
+        tree = self._workspace_trees.get(commit)
+        if tree is None:
+            tree = self._subtree(parse_commit(self._read(commit, b"commit"))[0], prefix)
+            self._workspace_trees[commit] = tree
+        return tree
+
+    def _subtree(self, tree: str, prefix: str) -> str:
+        """Id of the tree at prefix (e.g. "src/app/") below tree, "" if there is none."""
+        from vcs import parse_tree
+
+        for name in prefix.split("/")[:-1]:
+            for mode, entry_name, object_id in parse_tree(self._read(tree, b"tree")):
+                if entry_name == name and mode == _TREE:
+                    tree = object_id
+                    break
+            else:
+                return ""
+        return tree
+
+    def _entries(self, tree: str) -> Dict[str, Tuple[bytes, str]]:
+        from vcs import parse_tree
+
+        if not tree:
+            return {}
+        return {
+            name: (mode, object_id)
+            for mode, name, object_id in parse_tree(self._read(tree, b"tree"))
+        }
+
+    def _count(self, tree: str, rel_dir: str) -> List[int]:
+        key = (tree, rel_dir)
+        counts = self._tree_counts.get(key)
+        if counts is not None:
+            return counts
+        counts = [0] * len(marker_names())
+        for name, (mode, object_id) in self._entries(tree).items():
+            rel_path = rel_dir + name
+            if mode == _TREE:
+                if self._is_wanted(rel_path + "/"):
+                    for marker_id, count in enumerate(
+                        self._count(object_id, rel_path + "/")
+                    ):
+                        counts[marker_id] += count
+            else:
+                for marker_id, _, _ in self._rows(rel_path, mode, object_id):
+                    counts[marker_id] += 1
+        self._tree_counts[key] = counts
+        return counts
+
+    def compare(self, rev_a: str, rev_b: str) -> "RevisionDiff":
+        """Comments added, removed and moved between two revisions.
+
+        Only trees and blobs that differ are read, so the cost follows the size
+        of the change rather than of the repository.
+        """
+        from vcs import CatFile, show_prefix
+
+        workspace = self.scanner.workspace_path
+        prefix = show_prefix(workspace)
+        diff = RevisionDiff()
+        with CatFile(workspace) as self._cat:
+            old = self._workspace_tree(rev_a + "^{commit}", prefix)
+            new = self._workspace_tree(rev_b + "^{commit}", prefix)
+            for rel_path, old_rows, new_rows in self._diff(old, new, ""):
+                added, removed, moved = match_rows(old_rows, new_rows)
+                diff.added += self._comments(rel_path, added)
+                diff.removed += self._comments(rel_path, removed)
+                for old_row, new_row in moved:
+                    diff.moved += [
+                        (old_row[2], comment)
+                        for comment in self._comments(rel_path, [new_row])
+                    ]
+        self._cat = None
+        return diff
+
+    def _diff(
+        self, old: str, new: str, rel_dir: str
+    ) -> Iterator[Tuple[str, List[Tuple], List[Tuple]]]:
+        """(path, old rows, new rows) of the files that differ between two trees.
+
+        Subtrees with the same ID on both sides are skipped without being read.
+        """
+        if old == new:
+            return
+        old_entries, new_entries = self._entries(old), self._entries(new)
+        for name in sorted(old_entries.keys() | new_entries.keys()):
+            old_mode, old_id = old_entries.get(name, (None, ""))
+            new_mode, new_id = new_entries.get(name, (None, ""))
+            if old_mode == new_mode and old_id == new_id:
+                continue
+            rel_path = rel_dir + name
+            if _TREE in (old_mode, new_mode) and self._is_wanted(rel_path + "/"):
+                yield from self._diff(
+                    old_id if old_mode == _TREE else "",
+                    new_id if new_mode == _TREE else "",
+                    rel_path + "/",
+                )
+            old_rows = self._rows(rel_path, old_mode, old_id)
+            new_rows = self._rows(rel_path, new_mode, new_id)
+            if old_rows or new_rows:
+                yield rel_path, old_rows, new_rows
+
+    def _comments(self, rel_path: str, rows: List[Tuple]) -> List[Comment]:
+        """Comments of rows whose marker is not skipped."""
+        scanner = self.scanner
+        names = marker_names()
+        file_id = scanner.files.intern(rel_path.replace("/", os.sep))
+        return [
+            Comment(marker_id, text, file_id, line, scanner.files)
+            for marker_id, text, line in rows
+            if names[marker_id] not in scanner.skip_markers
+        ]
+
+    def _rows(self, rel_path: str, mode: Optional[bytes], blob: str) -> List[Tuple]:
+        """Rows of every marker in a blob, scanning each distinct blob once."""
+        if mode not in _FILE_MODES or not self._is_wanted(rel_path):
+            return []
+        extension = os.path.splitext(rel_path)[1].lower()[1:]
+        key = (blob, extension)
+        rows = self._blob_rows.get(key)
+        if rows is None:
+            data = self._read(blob, b"blob")
+            self.scanner.stats.bytes_read += len(data)
+            rows = self._blob_rows[key] = self.scanner._scan_content(data, extension)
+        return rows
+
+    def _is_wanted(self, rel_path: str) -> bool:
+        """iter_files' rules for a "/"-separated path; directories end in "/"."""
+        wanted = self._wanted.get(rel_path)
+        if wanted is None:
+            wanted = self._wanted[rel_path] = self._check_wanted(rel_path)
+        return wanted
+
+    def _check_wanted(self, rel_path: str) -> bool:
+        scanner = self.scanner
+        name = rel_path.rstrip("/").rsplit("/", 1)[-1]
+        if name.startswith(".") or scanner.exclude_patterns.match_file(rel_path):
+            return False
+        if rel_path.endswith("/"):
+            return True
+        extension = os.path.splitext(name)[1]
+        if (
+            extension[1:] not in scanner.file_extensions
+            or extension.lower()[1:] not in config.COMMENT_PATTERNS
+        ):
+            return False
+        return not self.filename_filter or scanner._matches_filename(
+            name, self.filename_filter, self.case_sensitive, self.complete_match
+        )
@@ -1,22 +1,43 @@
 from pathlib import Path
-from typing import List, Dict, Set
-from rich.console import Console
-from rich.table import Table
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    List,
+    Dict,
+    Set,
+    Iterator,
+    Iterable,
+    Optional,
+    TextIO,
+    Tuple,
+)
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from itertools import chain, islice
+import json
 import os
+import time
+import sqlite3
+import sys
 import config
 import argparse
-from pathspec import PathSpec
-from pathspec.patterns import GitWildMatchPattern
-import pandas as pd
-from fpdf import FPDF
-from rich.progress import (
-    Progress,
-    SpinnerColumn,
-    TextColumn,
-    TimeElapsedColumn,
-    BarColumn,
-    TaskProgressColumn,
-)
+from cache import MemoryCache, ScanCache, content_digest
+from context import LineIndex
+from records import Comment, FileTable, fingerprint, marker_names, walk_order
+from matcher import CommentMatcher, count_lines, normalize_newlines
+from stats import FileTimings, ScanStats, StageTimer
+
+# pathspec, rich, pandas and fpdf are imported where they are first needed: a
+# plain scan never loads pandas/fpdf, and --help loads none of them
+if TYPE_CHECKING:
+    from pathspec import PathSpec
+    from rich.console import Console
+    from history import CommitSummary
+
+# Called with the path that failed and a message describing the error
+ErrorHandler = Optional[Callable[[Path, str], None]]
+# Called with (path, seconds, size in bytes) for files slower than the threshold
+SlowFileHandler = Optional[Callable[[Path, float, int], None]]
 
 
 class CommentScanner:
@@ -25,16 +46,87 @@ class CommentScanner:
         workspace_path: str = None,
         skip_markers: Set[str] = None,
         show_context: bool = True,
+        jobs: int = 1,
+        use_cache: bool = False,
+        cache_dir: str = None,
+        cache_backend: str = "auto",
+        profile: bool = False,
+        slow_file_threshold: Optional[float] = None,
+        cache: Optional[ScanCache] = None,
+        only_paths: Optional[Iterable[str]] = None,
+        staged: bool = False,
+        baseline: Optional[Set[str]] = None,
+        fail_on: Optional[Dict[str, int]] = None,
+        max_results: Optional[int] = None,
     ):
         # Resolve relative paths
         workspace_path = workspace_path or config.DEFAULT_WORKSPACE
         self.workspace_path = Path(workspace_path).resolve()
-        self.console = Console()
+        self._console = None
         self.exclude_patterns = self._load_gitignore()
-        self.skip_markers = skip_markers or config.DEFAULT_SKIP_MARKERS
+        # An empty set (--include-all) skips nothing
+        self.skip_markers = (
+            config.DEFAULT_SKIP_MARKERS if skip_markers is None else skip_markers
+        )
+        # Relative paths shared by every Comment this scanner produces
+        self.files = FileTable()
         self.show_context = show_context
+        self._matchers: Dict[str, CommentMatcher] = {}
+        # Line indexes of recently rendered files, most recently used last
+        self._line_indexes: "OrderedDict[str, LineIndex]" = OrderedDict()
+        self.stats = ScanStats()
+        # Per-stage timings, only collected when profiling
+        self.timer: Optional[StageTimer] = StageTimer() if profile else None
+        # Wall time and size of every file of the last scan
+        self.file_timings = FileTimings(config.SLOW_FILES_SHOWN)
+        self.slow_file_threshold = slow_file_threshold
+        self.jobs = max(1, jobs)
+        # multiprocessing context of the worker pool; None is the platform default
+        self.mp_context = None
+        self.use_cache = use_cache
+        # A cache that outlives single scans (e.g. MemoryCache); overrides use_cache
+        self.cache = cache
+        # Relative paths to consider instead of walking the workspace (e.g. the
+        # files changed on a branch); the usual skip rules still apply to them
+        self.only_paths = None if only_paths is None else list(only_paths)
+        # Scan lines added in the git index instead of files (pre-commit hooks)
+        self.staged = staged
+        # Fingerprints of accepted comments, which are left out of the results
+        self.baseline = baseline
+        # iter_comments stops once a marker reaches its threshold (CI gates) or
+        # after max_results comments; gate_failure and truncated say which
+        self.fail_on = fail_on
+        self.max_results = max_results
+        self.gate_failure: Optional[Tuple[str, int, Comment]] = None
+        self.truncated = False
+        # Set when scan_workspace() or stream_jsonl() stopped on an exception
+        self.scan_error: Optional[str] = None
+        self.cache_dir = (
+            Path(cache_dir) if cache_dir else self.workspace_path / config.CACHE_DIR
+        )
+        # "git" also keys results by blob ID, "stat" by path only (see cache.py)
+        self.cache_backend = cache_backend
+        # FILE_PATTERNS are all of the form "*.ext", so matching them is a set lookup
+        self.file_extensions = {
+            pattern[2:] for pattern in config.FILE_PATTERNS if pattern.startswith("*.")
+        }
+
+    @property
+    def console(self) -> "Console":
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console()
+        return self._console
+
+    @console.setter
+    def console(self, console: "Console"):
+        self._console = console
+
+    def _load_gitignore(self) -> "PathSpec":
+        from pathspec import PathSpec
+        from pathspec.patterns import GitWildMatchPattern
 
-    def _load_gitignore(self) -> PathSpec:
         gitignore_patterns = []
         gitignore_path = self.workspace_path / ".gitignore"
 
@@ -66,35 +158,138 @@ class CommentScanner:
             rel_path = path.relative_to(self.workspace_path)
 
             # Apply filename filter if provided
-            if filename_filter:
-                filename = path.name
-                if complete_match:
-                    if case_sensitive:
-                        if filename != filename_filter:
-                            return True
-                    else:
-                        if filename.lower() != filename_filter.lower():
-                            return True
-                else:
-                    if case_sensitive:
-                        if filename_filter not in filename:
-                            return True
-                    else:
-                        if filename_filter.lower() not in filename.lower():
-                            return True
+            if filename_filter and not self._matches_filename(
+                path.name, filename_filter, case_sensitive, complete_match
+            ):
+                return True
 
             # Check if path matches gitignore patterns
             if self.exclude_patterns.match_file(str(rel_path)):
                 return True
 
             # Skip hidden files and directories
-            if any(part.startswith(".") for part in path.parts):
+            if any(part.startswith(".") for part in rel_path.parts):
                 return True
 
             return False
         except ValueError:  # For paths outside workspace
             return True
 
+    @staticmethod
+    def _matches_filename(
+        filename: str,
+        filename_filter: str,
+        case_sensitive: bool = False,
+        complete_match: bool = False,
+    ) -> bool:
+        if not case_sensitive:
+            filename = filename.lower()
+            filename_filter = filename_filter.lower()
+        if complete_match:
+            return filename == filename_filter
+        return filename_filter in filename
+
+    def iter_files(
+        self,
+        filename_filter: str = None,
+        case_sensitive: bool = False,
+        complete_match: bool = False,
+        on_error: ErrorHandler = None,
+    ) -> Iterator[Path]:
+        """Walk the workspace once, yielding candidate files in a stable order.
+
+        Hidden and gitignored directories are pruned before they are entered, so
+        nothing below them is ever listed. Unreadable directories are reported to
+        on_error(path, message) if given and skipped otherwise. With only_paths
+        set, those paths are filtered instead of walking the workspace.
+        """
+        if self.only_paths is not None:
+            for path in self._filter_paths(
+                self.only_paths, filename_filter, case_sensitive, complete_match
+            ):
+                if path.is_file():
+                    yield path
+            return
+
+        match_file = self.exclude_patterns.match_file
+        if self.timer is not None:
+            match_file = self.timer.timed_call("gitignore", match_file)
+
+        stats = self.stats
+        stack = [(str(self.workspace_path), "")]
+        while stack:
+            dir_path, rel_dir = stack.pop()
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                if on_error is not None:
+                    on_error(Path(dir_path), str(e))
+                continue
+
+            stats.entries_enumerated += len(entries)
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                if name.startswith("."):
+                    stats.files_hidden += 1
+                    continue
+                rel_path = rel_dir + name
+                try:
+                    # d_type answers both checks without a stat() for regular entries
+                    if entry.is_dir(follow_symlinks=False):
+                        if match_file(rel_path + "/"):
+                            stats.files_gitignored += 1
+                        else:
+                            subdirs.append((entry.path, rel_path + "/"))
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+
+                if os.path.splitext(name)[1][1:] not in self.file_extensions:
+                    stats.files_unmatched += 1
+                    continue
+                if match_file(rel_path):
+                    stats.files_gitignored += 1
+                    continue
+                if filename_filter and not self._matches_filename(
+                    name, filename_filter, case_sensitive, complete_match
+                ):
+                    continue
+                yield Path(entry.path)
+
+            # Reversed so subdirectories are visited in name order
+            stack.extend(reversed(subdirs))
+
+    def _filter_paths(
+        self,
+        rel_paths: Iterable[str],
+        filename_filter: str = None,
+        case_sensitive: bool = False,
+        complete_match: bool = False,
+    ) -> Iterator[Path]:
+        """Apply iter_files' rules to a list of relative paths, yielding in walk order."""
+        stats = self.stats
+        for rel_path in sorted(rel_paths, key=walk_order):
+            stats.entries_enumerated += 1
+            path = self.workspace_path / rel_path
+            if any(part.startswith(".") for part in Path(rel_path).parts):
+                stats.files_hidden += 1
+                continue
+            if os.path.splitext(path.name)[1][1:] not in self.file_extensions:
+                stats.files_unmatched += 1
+                continue
+            if self.exclude_patterns.match_file(rel_path):
+                stats.files_gitignored += 1
+                continue
+            if filename_filter and not self._matches_filename(
+                path.name, filename_filter, case_sensitive, complete_match
+            ):
+                continue
+            yield path
+
     def get_context_lines(self, all_lines: List[str], comment_line_idx: int) -> str:
         context = []
         start_idx = max(0, comment_line_idx - config.CONTEXT_LINES)
@@ -117,138 +312,156 @@ class CommentScanner:
 
         return "\n".join(context)
 
-    def scan_file(self, file_path: Path) -> List[Dict]:
-        comments = []
-        file_extension = file_path.suffix.lower()[1:]
-
-        # Skip files we don't support
-        if file_extension not in config.COMMENT_PATTERNS:
-            return comments
-
-        comment_patterns = config.COMMENT_PATTERNS[file_extension]
-
-        # Pre-compile patterns for faster matching
-        single_patterns = comment_patterns.get("single", [])
-        multiline_pattern = comment_patterns.get("multiline")
+    def get_context(self, comment: Comment) -> str:
+        """Render the context of a comment on demand from its file's line index."""
+        if not self.show_context:
+            return ""
+        if self.timer is not None:
+            start = time.perf_counter()
+        lines = self._line_index(comment["file"])
+        line_idx = comment["line"] - 1
+        context = ""
+        if line_idx < len(lines):  # Otherwise the file changed since the scan
+            context = self.get_context_lines(lines, line_idx)
+        if self.timer is not None:
+            self.timer.add("context", time.perf_counter() - start)
+        return context
+
+    def _line_index(self, rel_path: str) -> LineIndex:
+        lines = self._line_indexes.get(rel_path)
+        if lines is not None:
+            self._line_indexes.move_to_end(rel_path)
+            return lines
 
-        # Quick check if file might contain any markers
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                if not any(marker in content for marker in config.COMMENT_MARKERS):
-                    return comments
-
-                # Reset file pointer and continue with line-by-line processing
-                f.seek(0)
-                lines = f.readlines()
-        except UnicodeDecodeError:
-            return comments  # Skip binary files
-
-        in_multiline_comment = False
-        multiline_content = []
-
-        for line_num, line in enumerate(lines):
-            stripped_line = line.strip()
-            if not stripped_line:  # Skip empty lines early
-                continue
-
-            # Fast path: check if line might contain any comment
-            if not any(
-                pattern in stripped_line for pattern in single_patterns
-            ) and not (
-                multiline_pattern
-                and (
-                    multiline_pattern[0] in stripped_line
-                    or multiline_pattern[1] in stripped_line
-                )
-            ):
-                continue
-
-            # Handle multiline comments
-            if multiline_pattern:
-                start_pattern, end_pattern = multiline_pattern
-
-                if (
-                    start_pattern in stripped_line
-                    and end_pattern
-                    in stripped_line[
-                        stripped_line.find(start_pattern) + len(start_pattern) :
-                    ]
-                ):
-                    comment_text = stripped_line[
-                        stripped_line.find(start_pattern)
-                        + len(start_pattern) : stripped_line.rfind(end_pattern)
-                    ].strip()
-                    self._process_comment(
-                        comment_text, comments, file_path, line_num, lines
-                    )
-                    continue
-
-                if start_pattern in stripped_line and not in_multiline_comment:
-                    in_multiline_comment = True
-                    multiline_content = [
-                        stripped_line[
-                            stripped_line.find(start_pattern) + len(start_pattern) :
-                        ].strip()
-                    ]
-                    continue
-
-                if in_multiline_comment:
-                    if end_pattern in stripped_line:
-                        in_multiline_comment = False
-                        multiline_content.append(
-                            stripped_line[: stripped_line.find(end_pattern)].strip()
-                        )
-                        comment_text = " ".join(multiline_content)
-                        self._process_comment(
-                            comment_text, comments, file_path, line_num, lines
-                        )
-                        multiline_content = []
-                    else:
-                        multiline_content.append(stripped_line)
-                    continue
-
-            # Handle single-line comments
-            for pattern in single_patterns:
-                if pattern in stripped_line:
-                    comment_text = stripped_line[
-                        stripped_line.find(pattern) + len(pattern) :
-                    ].strip()
-                    self._process_comment(
-                        comment_text, comments, file_path, line_num, lines
-                    )
-                    break
+            with open(self.workspace_path / rel_path, "rb") as f:
+                lines = LineIndex(f.read())
+        except OSError:
+            lines = LineIndex(b"")
+        self._remember_line_index(rel_path, lines)
+        return lines
+
+    def _remember_line_index(self, rel_path: str, lines: LineIndex):
+        self._line_indexes[rel_path] = lines
+        if len(self._line_indexes) > config.CONTEXT_CACHE_SIZE:
+            self._line_indexes.popitem(last=False)
+
+    def scan_file(self, file_path: Path) -> List[Comment]:
+        rows, _, _ = self._read_and_scan(file_path)
+        return self._rows_to_comments(
+            str(file_path.relative_to(self.workspace_path)), rows
+        )
 
+    def _rows_to_comments(self, rel_path: str, rows: List[Tuple]) -> List[Comment]:
+        if not rows:
+            return []
+        stats = self.stats
+        stats.count_markers(rows)
+        names = marker_names()
+        file_id = self.files.intern(rel_path)
+        baseline = self.baseline
+        comments = [
+            Comment(marker_id, text, file_id, line, self.files)
+            for marker_id, text, line in rows
+            if names[marker_id] not in self.skip_markers
+            and (
+                baseline is None
+                or fingerprint(rel_path, names[marker_id], text) not in baseline
+            )
+        ]
+        if comments:
+            reported = stats.marker_comments
+            for comment in comments:
+                reported[comment.marker_id] = reported.get(comment.marker_id, 0) + 1
+            top_dir = rel_path.split(os.sep, 1)[0] if os.sep in rel_path else ""
+            stats.directory_comments[top_dir] = stats.directory_comments.get(
+                top_dir, 0
+            ) + len(comments)
         return comments
 
-    def _process_comment(
+    @staticmethod
+    def _is_supported(file_path: Path) -> bool:
+        return file_path.suffix.lower()[1:] in config.COMMENT_PATTERNS
+
+    def _read_and_scan(
         self,
-        comment_text: str,
-        comments: List[Dict],
         file_path: Path,
-        line_num: int,
-        lines: List[str],
-    ) -> None:
-        """Helper method to process and add valid comments to the comments list."""
-        for marker in config.COMMENT_MARKERS:
-            if comment_text.startswith(marker) and marker not in self.skip_markers:
-                comments.append(
-                    {
-                        "type": marker,
-                        "text": comment_text[len(marker) :].strip(),
-                        "file": str(file_path.relative_to(self.workspace_path)),
-                        "line": line_num + 1,
-                        "context": self.get_context_lines(lines, line_num),
-                    }
-                )
-                break
+        expected_digest: Optional[bytes] = None,
+        hash_content: bool = False,
+    ) -> Tuple[Optional[List[Tuple]], Optional[bytes], int]:
+        """Read a file once and extract (marker id, text, line) rows for every marker.
+
+        Returns (rows, digest, size in bytes). rows is None when the content hash
+        equals expected_digest, i.e. the caller's cached rows are still valid and
+        the file was not parsed.
+        """
+        # Skip files we don't support
+        if not self._is_supported(file_path):
+            self.stats.files_unsupported += 1
+            return [], None, 0
+
+        timer = self.timer
+        if timer is not None:
+            start = time.perf_counter()
+        with open(file_path, "rb") as f:
+            data = f.read()
+        self.stats.bytes_read += len(data)
+        if timer is not None:
+            read_done = time.perf_counter()
+            timer.add("read", read_done - start)
+
+        digest = None
+        if hash_content or expected_digest is not None:
+            digest = content_digest(data)
+            if digest == expected_digest:
+                return None, digest, len(data)
+
+        rows = self._scan_content(data, file_path.suffix.lower()[1:])
+        if timer is not None:
+            timer.add("parse", time.perf_counter() - read_done)
+        return rows, digest, len(data)
+
+    def _matcher(self, file_extension: str) -> CommentMatcher:
+        matcher = self._matchers.get(file_extension)
+        if matcher is None:
+            matcher = CommentMatcher(config.COMMENT_PATTERNS[file_extension])
+            self._matchers[file_extension] = matcher
+        return matcher
+
+    def _scan_content(self, data: bytes, file_extension: str) -> List[Tuple]:
+        # Quick check if file might contain any marked comment, on the raw bytes
+        matcher = self._matcher(file_extension)
+        stats = self.stats
+        stats.prefilter_checked += 1
+        stats.lines_read += count_lines(data)
+        if not matcher.might_contain_comments(data):
+            return []
+        stats.prefilter_passed += 1
+
+        # Context is not built here; get_context() renders it when displayed
+        return [
+            (marker_id, text, line_num + 1)
+            for marker_id, text, line_num in matcher.scan(
+                normalize_newlines(data), stats
+            )
+        ]
 
     def scan_workspace(
         self,
         filename_filter: str = None,
         case_sensitive: bool = True,
         complete_match: bool = False,
-    ) -> List[Dict]:
+    ) -> List[Comment]:
+        from rich.progress import (
+            Progress,
+            SpinnerColumn,
+            TextColumn,
+            TimeElapsedColumn,
+            BarColumn,
+            TaskProgressColumn,
+        )
+        from rich.markup import escape
+
         all_comments = []
 
         with Progress(
@@ -263,32 +476,712 @@ class CommentScanner:
             scan_task = progress.add_task("[cyan]Scanning files...", total=None)
             files_processed = 0
 
-            for pattern in config.FILE_PATTERNS:
-                try:
-                    for file_path in self.workspace_path.rglob(pattern):
-                        if file_path.is_file() and not self.should_skip_path(
-                            file_path, filename_filter, case_sensitive, complete_match
-                        ):
-                            try:
-                                files_processed += 1
-                                progress.update(
-                                    scan_task,
-                                    completed=files_processed,
-                                    description=f"[cyan]Scanning: {file_path.name}",
-                                )
-                                file_comments = self.scan_file(file_path)
-                                if file_comments:  # Only extend if we found comments
-                                    all_comments.extend(file_comments)
-                            except Exception as e:
-                                self.console.print(
-                                    f"Error scanning {file_path}: {e}", style="red"
-                                )
-                except Exception as e:
-                    self.console.print(f"Error during workspace scan: {e}", style="red")
+            def on_file(file_path: Path):
+                nonlocal files_processed
+                files_processed += 1
+                progress.update(
+                    scan_task,
+                    completed=files_processed,
+                    description=f"[cyan]Scanning: {escape(file_path.name)}",
+                )
+
+            try:
+                all_comments.extend(
+                    self.iter_comments(
+                        filename_filter,
+                        case_sensitive,
+                        complete_match,
+                        on_error=self._print_error,
+                        on_file=on_file,
+                        on_slow_file=self._print_slow_file,
+                    )
+                )
+            except Exception as e:
+                self.scan_error = str(e)
+                self.console.print(
+                    f"Error during workspace scan: {e}", style="red", markup=False
+                )
 
         return all_comments
 
+    def count_comments(
+        self,
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+    ) -> Dict[str, int]:
+        """Comments per reported marker, without building context or a table."""
+        counts = {name: 0 for name in marker_names() if name not in self.skip_markers}
+        for comment in self.iter_comments(
+            filename_filter,
+            case_sensitive,
+            complete_match,
+            on_error=self._print_error,
+            on_slow_file=self._print_slow_file,
+        ):
+            counts[comment.type] += 1
+        return counts
+
+    def _print_gate_failure(self):
+        marker, threshold, comment = self.gate_failure
+        self.console.print(
+            f"--fail-on {marker}={threshold} reached at {comment.file}:{comment.line}"
+            f" ({comment.text}); scan stopped",
+            style="red",
+            markup=False,
+        )
+
+    def _print_truncated(self):
+        self.console.print(
+            f"Stopped after {self.max_results} results (--max-results)", style="dim"
+        )
+
+    def _print_error(self, path: Path, message: str):
+        self.console.print(
+            f"Error scanning {path}: {message}", style="red", markup=False
+        )
+
+    def _print_slow_file(self, path: Path, seconds: float, size: int):
+        self.console.print(
+            f"Slow file: {self._relative(path)} took {seconds * 1000:.1f} ms "
+            f"({_format_size(size)})",
+            style="yellow",
+            # Paths like app/[id].ts are not markup
+            markup=False,
+        )
+
+    def stream_jsonl(
+        self,
+        output: TextIO,
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+    ) -> int:
+        """Write comments to output as JSON lines while the scan is running.
+
+        Output is flushed after every file, so each file's comments are visible as
+        soon as it has been scanned; nothing is accumulated. Returns the number of
+        comments written.
+        """
+        written = 0
+        try:
+            for comment in self.iter_comments(
+                filename_filter,
+                case_sensitive,
+                complete_match,
+                on_error=self._print_error,
+                on_file=lambda _: output.flush(),
+                on_slow_file=self._print_slow_file,
+            ):
+                output.write(self._to_json_line(comment))
+                written += 1
+        except BrokenPipeError:
+            raise  # The reader went away, e.g. piped into head
+        except Exception as e:
+            self.scan_error = str(e)
+            self.console.print(
+                f"Error during workspace scan: {e}", style="red", markup=False
+            )
+        return written
+
+    def watch(
+        self,
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+        output: Optional[TextIO] = None,
+    ):
+        """Scan, then keep the results current as files change until interrupted.
+
+        Without output the comment table is re-rendered after every debounced
+        batch of changes. With output, JSON line events are written to it instead:
+        {"event": "update", "file": ..., "comments": [...]} for a new or changed
+        file, {"event": "delete", "file": ...} when a file no longer has results.
+        """
+        from watch import WatchSession, open_watcher, wait_for_changes
+
+        session = WatchSession(
+            self, filename_filter, case_sensitive, complete_match, self._print_error
+        )
+        self._show_watch_update(session, session.scan(), output)
+        watcher = open_watcher(
+            session,
+            on_fallback=lambda message: self.console.print(
+                message, style="dim", markup=False
+            ),
+        )
+        try:
+            while True:
+                changes = wait_for_changes(watcher, config.WATCH_DEBOUNCE)
+                updated = session.apply(changes)
+                if changes is None or session.gitignore_path in changes:
+                    watcher.rewatch()
+                if updated:
+                    self._show_watch_update(session, updated, output)
+        finally:
+            watcher.close()
+
+    def _show_watch_update(
+        self,
+        session,
+        updated: Dict[str, Optional[List[Comment]]],
+        output: Optional[TextIO],
+    ):
+        if output is None:
+            self.console.clear()
+            comments = session.comments()
+            if comments:
+                self.display_comments(comments)
+            else:
+                self.console.print("No comments found!", style="yellow")
+            self.console.print(
+                f"Watching {self.workspace_path} (Ctrl+C to stop)",
+                style="dim",
+                markup=False,
+            )
+            return
+        for rel_path, comments in updated.items():
+            if comments is None:
+                event = {"event": "delete", "file": rel_path}
+            else:
+                event = {
+                    "event": "update",
+                    "file": rel_path,
+                    "comments": [self._to_json_record(c) for c in comments],
+                }
+            output.write(json.dumps(event, ensure_ascii=False) + "\n")
+        output.flush()
+
+    def _to_json_line(self, comment: Comment) -> str:
+        return json.dumps(self._to_json_record(comment), ensure_ascii=False) + "\n"
+
+    def _to_json_record(self, comment: Comment) -> Dict:
+        record = comment.as_dict()
+        if self.show_context:
+            record["context"] = self.get_context(comment)
+        return record
+
+    def iter_comments(
+        self,
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+        on_error: ErrorHandler = None,
+        on_file: Optional[Callable[[Path], None]] = None,
+        on_slow_file: SlowFileHandler = None,
+    ) -> Iterator[Comment]:
+        """Yield comments lazily, in walk order, without any console output.
+
+        on_error(path, message) is called for files and directories that could not
+        be read, on_file(path) once each file has been scanned, and
+        on_slow_file(path, seconds, size) for files that took at least
+        slow_file_threshold seconds. Stopping early (break or close()) shuts down
+        worker processes and closes the cache. The same happens right after the
+        comment that reaches a fail_on threshold (recorded in gate_failure) or
+        the max_results-th comment (truncated is set).
+        """
+        fail_on = self.fail_on or {}
+        max_results = self.max_results
+        limited = bool(fail_on) or max_results is not None
+        found = dict.fromkeys(fail_on, 0)
+        reported = 0
+        self.gate_failure = None
+        self.truncated = False
+        self.scan_error = None
+        results = self._scan_results(
+            filename_filter, case_sensitive, complete_match, on_error, on_slow_file
+        )
+        try:
+            for file_path, file_comments, error in results:
+                if error is not None:
+                    if on_error is not None:
+                        on_error(file_path, error)
+                elif not limited:
+                    yield from file_comments
+                else:
+                    for comment in file_comments:
+                        yield comment
+                        reported += 1
+                        marker = comment.type
+                        if marker in found:
+                            found[marker] += 1
+                            if found[marker] >= fail_on[marker]:
+                                self.gate_failure = (marker, fail_on[marker], comment)
+                                return
+                        if reported == max_results:
+                            self.truncated = True
+                            return
+                if on_file is not None:
+                    on_file(file_path)
+        finally:
+            results.close()
+
+    def _scan_results(
+        self,
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+        on_error: ErrorHandler = None,
+        on_slow_file: SlowFileHandler = None,
+    ) -> Iterator[Tuple[Path, List[Comment], Optional[str]]]:
+        """Scan the workspace file by file, yielding (path, comments, error) in walk order."""
+        self.stats = ScanStats()
+        file_timings = self.file_timings = FileTimings(config.SLOW_FILES_SHOWN)
+        threshold = self.slow_file_threshold
+        if on_slow_file is None:
+            threshold = None
+        if self.staged:
+            results = self._scan_staged(filename_filter, case_sensitive, complete_match)
+            try:
+                for file_path, file_comments, error, seconds, size in results:
+                    file_timings.add(str(file_path), seconds, size)
+                    if threshold is not None and seconds >= threshold:
+                        on_slow_file(file_path, seconds, size)
+                    yield file_path, file_comments, error
+            finally:
+                results.close()
+            return
+
+        cache = self._open_cache(on_error)
+        # Entries for vanished files are only dropped after an unfiltered walk
+        seen_paths = (
+            set()
+            if cache is not None and not filename_filter and self.only_paths is None
+            else None
+        )
+
+        file_paths = self.iter_files(
+            filename_filter, case_sensitive, complete_match, on_error
+        )
+        if self.timer is not None:
+            file_paths = self.timer.timed_iter("walk", file_paths)
+        if self.jobs > 1:
+            results = self._scan_parallel(file_paths, cache)
+        else:
+            results = self._scan_serial(file_paths, cache)
+
+        try:
+            for file_path, file_comments, error, seconds, size in results:
+                if seen_paths is not None:
+                    seen_paths.add(self._relative(file_path))
+                file_timings.add(str(file_path), seconds, size)
+                if threshold is not None and seconds >= threshold:
+                    on_slow_file(file_path, seconds, size)
+                yield file_path, file_comments, error
+
+            if seen_paths is not None:
+                cache.prune(seen_paths)
+        finally:
+            # Close explicitly so an abandoned scan stops its workers right away
+            results.close()
+            file_paths.close()
+            if cache is not None:
+                cache.close()
+
+    def _scan_staged(
+        self,
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+    ) -> Iterator[Tuple[Path, List[Comment], Optional[str], float, int]]:
+        """Yield the comments that start on a line added in the git index.
+
+        Files whose added lines can't hold a marked comment (by the prefilter) are
+        rejected from the diff alone. The rest are parsed from their staged blobs,
+        so multiline comments opened or closed outside a hunk are still read
+        correctly; only comments whose first line was added are reported.
+        """
+        from vcs import read_staged_blobs, staged_additions
+
+        stats = self.stats
+        additions = staged_additions(self.workspace_path)
+        candidates = []
+        for path in self._filter_paths(
+            additions, filename_filter, case_sensitive, complete_match
+        ):
+            if not self._is_supported(path):
+                stats.files_unsupported += 1
+                continue
+            rel_path = self._relative(path)
+            matcher = self._matcher(path.suffix.lower()[1:])
+            added = additions[rel_path]
+            stats.prefilter_checked += 1
+            if matcher.might_contain_comments(b"\n".join(line for _, line in added)):
+                stats.prefilter_passed += 1
+                candidates.append((path, rel_path, matcher))
+            else:
+                # Rejected from the diff alone: only the added lines were read
+                stats.lines_read += len(added)
+
+        blobs = read_staged_blobs(self.workspace_path, [c[1] for c in candidates])
+        for path, rel_path, matcher in candidates:
+            start = time.perf_counter()
+            data = normalize_newlines(blobs.get(rel_path, b""))
+            stats.bytes_read += len(data)
+            stats.lines_read += count_lines(data)
+            start_lines = []
+            hits = matcher.scan(data, stats, start_lines)
+            added_lines = {line_num for line_num, _ in additions[rel_path]}
+            rows = [
+                (marker_id, text, line_idx + 1)
+                for (marker_id, text, line_idx), first_idx in zip(hits, start_lines)
+                if first_idx + 1 in added_lines
+            ]
+            # Context must show the staged content, not the working tree
+            self._remember_line_index(rel_path, LineIndex(data))
+            comments = self._rows_to_comments(rel_path, rows)
+            yield path, comments, None, time.perf_counter() - start, len(data)
+
+    def _relative(self, file_path: Path) -> str:
+        return str(file_path.relative_to(self.workspace_path))
+
+    def _open_cache(self, on_error: ErrorHandler = None) -> Optional[ScanCache]:
+        if self.cache is not None:
+            return self.cache
+        if not self.use_cache:
+            return None
+        try:
+            if self.cache_backend != "stat":
+                from cache import GitBlobCache
+                from vcs import GitError
+
+                try:
+                    return GitBlobCache(self.cache_dir, self.workspace_path)
+                except GitError as e:
+                    # Not a work tree (or no git): auto quietly uses the stat cache
+                    if self.cache_backend == "git" and on_error is not None:
+                        on_error(
+                            self.workspace_path, f"git blob cache unavailable: {e}"
+                        )
+            return ScanCache(self.cache_dir)
+        except (OSError, sqlite3.Error) as e:
+            if on_error is not None:
+                on_error(self.cache_dir, f"scan cache disabled: {e}")
+            return None
+
+    def _lookup_cached(
+        self, file_path: Path, rel_path: str, cache: Optional[ScanCache]
+    ) -> Tuple[Optional[os.stat_result], Optional[List[Tuple]], Optional[bytes]]:
+        """Return (stat, rows, expected_digest); rows is None when the file must be read."""
+        if cache is None or not self._is_supported(file_path):
+            return None, None, None
+        if self.timer is not None:
+            start = time.perf_counter()
+        st = os.stat(file_path)
+        rows, expected_digest = cache.lookup(rel_path, st)
+        self.stats.cache_lookups += 1
+        if rows is not None:
+            self.stats.files_cached += 1
+        if self.timer is not None:
+            self.timer.add("cache", time.perf_counter() - start)
+        return st, rows, expected_digest
+
+    def _store_cached(
+        self,
+        cache: Optional[ScanCache],
+        rel_path: str,
+        st: Optional[os.stat_result],
+        digest: Optional[bytes],
+        rows: Optional[List[Tuple]],
+    ) -> List[Tuple]:
+        if st is None:
+            return rows
+        reused = rows is None
+        if reused:
+            self.stats.files_cached += 1
+            rows = cache.rows_for(rel_path)
+        cache.store(rel_path, st, digest, rows, reused=reused)
+        return rows
+
+    def _scan_serial(
+        self, file_paths: Iterable[Path], cache: Optional[ScanCache] = None
+    ) -> Iterator[Tuple[Path, List[Comment], Optional[str], float, int]]:
+        for file_path in file_paths:
+            start = time.perf_counter()
+            rel_path = self._relative(file_path)
+            size = 0
+            try:
+                st, rows, expected_digest = self._lookup_cached(
+                    file_path, rel_path, cache
+                )
+                if st is not None:
+                    size = st.st_size
+                if rows is None:
+                    rows, digest, size = self._read_and_scan(
+                        file_path, expected_digest, hash_content=st is not None
+                    )
+                    rows = self._store_cached(cache, rel_path, st, digest, rows)
+                comments = self._rows_to_comments(rel_path, rows)
+            except Exception as e:
+                yield file_path, [], str(e), time.perf_counter() - start, size
+                continue
+            yield file_path, comments, None, time.perf_counter() - start, size
+
+    def _scan_parallel(
+        self, file_paths: Iterable[Path], cache: Optional[ScanCache] = None
+    ) -> Iterator[Tuple[Path, List[Comment], Optional[str], float, int]]:
+        """Scan files on a process pool, yielding results in walk order.
+
+        Paths are sent in batches and only a bounded number of batches is kept in
+        flight, so discovery and scanning overlap without queueing the whole tree.
+        Cache hits are resolved here and never reach a worker.
+        """
+        file_paths = iter(file_paths)
+        # A pool only pays off beyond a single batch; small scans (e.g. from a
+        # pre-commit hook) stay in-process and skip the worker start-up cost
+        first_batch = list(islice(file_paths, config.SCAN_BATCH_SIZE + 1))
+        if len(first_batch) <= config.SCAN_BATCH_SIZE:
+            yield from self._scan_serial(first_batch, cache)
+            return
+        file_paths = chain(first_batch, file_paths)
+
+        from concurrent.futures import Future, ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            mp_context=self.mp_context,
+            initializer=_init_worker,
+            initargs=(
+                str(self.workspace_path),
+                self.skip_markers,
+                self.show_context,
+                config.COMMENT_PATTERNS,
+                config.COMMENT_MARKERS,
+                self.timer is not None,
+            ),
+        )
+        try:
+            pending = deque()
+            while True:
+                batch = []
+                work = []
+                for file_path in islice(file_paths, config.SCAN_BATCH_SIZE):
+                    start = time.perf_counter()
+                    rel_path = self._relative(file_path)
+                    try:
+                        st, rows, expected_digest = self._lookup_cached(
+                            file_path, rel_path, cache
+                        )
+                    except Exception as e:
+                        batch.append((file_path, rel_path, None, [], str(e), 0.0))
+                        continue
+                    # Time spent here; the worker adds its own read and parse time
+                    batch.append(
+                        (
+                            file_path,
+                            rel_path,
+                            st,
+                            rows,
+                            None,
+                            time.perf_counter() - start,
+                        )
+                    )
+                    if rows is None:
+                        work.append((str(file_path), expected_digest, st is not None))
+                if batch:
+                    future = None
+                    if work:
+                        try:
+                            future = executor.submit(_scan_batch, work)
+                        except Exception as e:
+                            # e.g. the pool broke on an earlier batch
+                            future = Future()
+                            future.set_exception(e)
+                    pending.append((batch, future))
+                if pending and (not batch or len(pending) >= self.jobs * 4):
+                    yield from self._collect_batch(*pending.popleft(), cache)
+                elif not batch:
+                    break
+        finally:
+            # Batches not yet started are dropped when the consumer stops early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _collect_batch(
+        self, batch: List[Tuple], future, cache: Optional[ScanCache]
+    ) -> Iterator[Tuple[Path, List[Comment], Optional[str], float, int]]:
+        """Merge a worker's results back with the cache hits of the same batch.
+
+        Errors are reported per file, as _scan_serial does; if the whole batch
+        failed (e.g. a worker died), each of its files reports that error.
+        """
+        results = ()
+        batch_error = None
+        if future is not None:
+            try:
+                results, stats, timer = future.result()
+            except Exception as e:
+                batch_error = str(e)
+            else:
+                self.stats.merge(stats)
+                if timer is not None:
+                    self.timer.merge(timer)
+        results = iter(results)
+        for file_path, rel_path, st, rows, error, seconds in batch:
+            size = st.st_size if st is not None else 0
+            try:
+                if error is None and rows is None:
+                    if batch_error is not None:
+                        error = batch_error
+                    else:
+                        rows, digest, error, worker_seconds, size = next(results)
+                        seconds += worker_seconds
+                    if error is None:
+                        rows = self._store_cached(cache, rel_path, st, digest, rows)
+                if error is None:
+                    comments = self._rows_to_comments(rel_path, rows)
+            except Exception as e:
+                error = str(e)
+            if error is not None:
+                yield file_path, [], error, seconds, size
+            else:
+                yield file_path, comments, None, seconds, size
+
+    def display_stats(self):
+        stats = self.stats
+        lines = [
+            f"Walk: {stats.entries_enumerated} entries enumerated, "
+            f"{stats.files_hidden} hidden, {stats.files_gitignored} gitignored, "
+            f"{stats.files_unmatched} not in FILE_PATTERNS, "
+            f"{stats.files_unsupported} without COMMENT_PATTERNS syntax",
+            f"Cache: {stats.files_cached} of {stats.cache_lookups} files reused "
+            f"without parsing ({stats.cache_hit_ratio:.1%} hit ratio)",
+            f"Prefilter: {stats.prefilter_passed} of {stats.prefilter_checked} files "
+            f"had candidate comments ({stats.prefilter_hit_rate:.1%} hit rate, "
+            f"{stats.prefilter_rejected} rejected)",
+            f"Lines: {stats.lines_read} read ({_format_size(stats.bytes_read)}), "
+            f"{stats.lines_fast_rejected} rejected "
+            f"by the delimiter fast path, {stats.lines_examined} examined, "
+            f"{stats.multiline_blocks} multiline blocks entered",
+            "Matches: "
+            + ", ".join(
+                f"{name} {count}"
+                for name, count in stats.matches_by_marker(marker_names()).items()
+            ),
+        ]
+        for line in lines:
+            self.console.print(line, style="dim")
+
+    def display_slow_files(self):
+        """Print the slowest files of the last scan and a per-file latency histogram."""
+        from rich.markup import escape
+        from rich.table import Table
+
+        timings = self.file_timings
+        if not timings.files:
+            return
+        table = Table(title=f"Slowest {timings.top_n} files", title_style="bold")
+        table.add_column("File", style="cyan")
+        table.add_column("ms", justify="right")
+        table.add_column("Size", justify="right")
+        table.add_column("MB/s", justify="right")
+        for seconds, size, path in timings.slowest():
+            throughput = size / seconds / 1e6 if seconds else 0.0
+            table.add_row(
+                escape(self._relative(Path(path))),
+                f"{seconds * 1000:.1f}",
+                _format_size(size),
+                f"{throughput:.1f}",
+            )
+        self.console.print(table)
+
+        histogram = Table(title="Per-file latency", title_style="bold")
+        histogram.add_column("Latency")
+        histogram.add_column("Files", justify="right")
+        histogram.add_column("")
+        largest = max(timings.buckets)
+        for label, count in timings.histogram():
+            histogram.add_row(label, str(count), "█" * round(30 * count / largest))
+        self.console.print(histogram)
+        self.console.print(
+            f"{timings.files} files, {_format_size(timings.bytes)} in "
+            f"{timings.seconds:.3f} s of per-file time",
+            style="dim",
+        )
+
+    def display_profile(self, wall_seconds: float):
+        """Print the per-stage timings collected with profile=True."""
+        from rich.table import Table
+
+        timer = self.timer
+        table = Table(title="Profile", title_style="bold")
+        table.add_column("Stage", style="cyan")
+        table.add_column("Calls", justify="right")
+        table.add_column("Seconds", justify="right")
+        table.add_column("% of wall", justify="right")
+        for stage, seconds in sorted(
+            timer.seconds.items(), key=lambda item: item[1], reverse=True
+        ):
+            share = seconds / wall_seconds if wall_seconds else 0.0
+            table.add_row(
+                stage, str(timer.calls[stage]), f"{seconds:.3f}", f"{share:.1%}"
+            )
+        table.add_row("total (wall)", "", f"{wall_seconds:.3f}", "100.0%", style="bold")
+        self.console.print(table)
+        self.console.print(
+            "Stages overlap: gitignore runs inside walk, context inside render and "
+            "export. With --jobs > 1, read and parse are summed across workers.",
+            style="dim",
+        )
+
+    def display_history(self, summaries: List["CommitSummary"]):
+        """Print marker counts per commit, then each commit's changes if collected."""
+        from rich.markup import escape
+        from rich.table import Table
+
+        markers = list(summaries[0].counts) if summaries else []
+        table = Table(title="Comments by commit", title_style="bold")
+        table.add_column("Commit", style="cyan")
+        table.add_column("Date", style="dim")
+        for marker in markers:
+            table.add_column(
+                marker,
+                justify="right",
+                style=config.COMMENT_COLORS.get(marker, "white"),
+            )
+        table.add_column("Subject")
+        for summary in summaries:
+            table.add_row(
+                summary.commit[:10],
+                time.strftime("%Y-%m-%d", time.gmtime(summary.timestamp)),
+                *(str(summary.counts[marker]) for marker in markers),
+                # Subjects like "[fix] ..." are not markup
+                escape(summary.subject),
+            )
+        self.console.print(table)
+
+        for summary in summaries:
+            if not summary.added and not summary.removed:
+                continue
+            self.console.print(
+                f"\n{summary.commit[:10]} {summary.subject}", style="bold", markup=False
+            )
+            for sign, comments, style in (
+                ("+", summary.added, "green"),
+                ("-", summary.removed, "red"),
+            ):
+                for comment in comments:
+                    self.console.print(
+                        f"{sign} {comment.file}:{comment.line}: "
+                        f"{comment.type}: {comment.text}",
+                        style=style,
+                        markup=False,
+                        highlight=False,
+                    )
+
+    def _stage(self, stage: str):
+        """Time a coarse pipeline stage when profiling, otherwise do nothing."""
+        if self.timer is None:
+            return nullcontext()
+        return self.timer.stage(stage)
+
     def display_comments(self, comments: List[Dict]):
+        with self._stage("render"):
+            self._display_comments(comments)
+
+    def _display_comments(self, comments: List[Dict]):
+        from rich.markup import escape
+        from rich.table import Table
+
         table = Table(title="Project Comments Overview", show_lines=True)
 
         table.add_column("Type", style="bold")
@@ -301,12 +1194,12 @@ class CommentScanner:
         for comment in sorted(comments, key=lambda x: x["type"]):
             row = [
                 config.COMMENT_MARKERS[comment["type"]],
-                comment["text"],
-                comment["file"],
+                escape(comment["text"]),
+                escape(comment["file"]),
                 str(comment["line"]),
             ]
             if self.show_context:
-                row.insert(2, comment["context"])
+                row.insert(2, escape(self.get_context(comment)))
 
             table.add_row(
                 *row, style=config.COMMENT_COLORS.get(comment["type"], "white")
@@ -315,6 +1208,12 @@ class CommentScanner:
         self.console.print(table)
 
     def export_to_pdf(self, comments: List[Dict], output_path: str):
+        with self._stage("export"):
+            self._export_to_pdf(comments, output_path)
+
+    def _export_to_pdf(self, comments: List[Dict], output_path: str):
+        from fpdf import FPDF
+
         class PDF(FPDF):
             def multi_cell_row(self, heights, cols, border=1):
                 # Calculate max number of lines for all columns
@@ -381,7 +1280,7 @@ class CommentScanner:
 
                 if self.show_context:
                     # Clean up context for PDF compatibility
-                    context = comment["context"]
+                    context = self.get_context(comment)
                     context = context.replace("→", ">")
                     context = context.encode("ascii", "replace").decode("ascii")
                     context = context.replace(
@@ -404,6 +1303,12 @@ class CommentScanner:
         pdf.output(output_path)
 
     def export_to_excel(self, comments: List[Dict], output_path: str):
+        with self._stage("export"):
+            self._export_to_excel(comments, output_path)
+
+    def _export_to_excel(self, comments: List[Dict], output_path: str):
+        import pandas as pd
+
         df_data = []
         for comment in comments:
             row = {
@@ -413,33 +1318,280 @@ class CommentScanner:
                 "Line": comment["line"],
             }
             if self.show_context:
-                row["Context"] = comment["context"]
+                row["Context"] = self.get_context(comment)
             df_data.append(row)
 
         df = pd.DataFrame(df_data)
         df.to_excel(output_path, index=False, engine="openpyxl")
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Scan TypeScript project comments",
-        epilog="""
-Examples:
-  %(prog)s                                    # Scan all files with default settings
-  %(prog)s -w /path/to/project               # Scan a specific workspace
-  %(prog)s -f test.py                        # Find comments in files containing 'test.py' (case insensitive)
-  %(prog)s -f test.py -c                     # Find comments in files named exactly 'test.py'
-  %(prog)s -f Test.py -C                     # Find comments with case-sensitive filename match
-  %(prog)s -f test.py -c -C                  # Find comments in files named exactly 'test.py' (case sensitive)
-  %(prog)s --skip TODO FIXME                 # Skip TODO and FIXME comments
-  %(prog)s -a                                # Include all comment types
-  %(prog)s -e pdf -o comments.pdf            # Export comments to PDF
-        """,
-        formatter_class=argparse.RawDescriptionHelpFormatter,
+# Per-process scanner used by the parallel backend, set up once by _init_worker
+_worker_scanner: Optional[CommentScanner] = None
+
+
+def _init_worker(
+    workspace_path: str,
+    skip_markers: Set[str],
+    show_context: bool,
+    comment_patterns: Dict,
+    comment_markers: Dict[str, str],
+    profile: bool,
+):
+    global _worker_scanner
+    # Mirror the parent's configuration, which may differ from the module defaults
+    config.COMMENT_PATTERNS = comment_patterns
+    config.COMMENT_MARKERS = comment_markers
+    _worker_scanner = CommentScanner(
+        workspace_path, skip_markers, show_context, profile=profile
     )
-    parser.add_argument(
-        "--workspace", "-w", type=str, help="Path to the workspace directory"
+
+
+def _scan_batch(
+    work: List[Tuple[str, Optional[bytes], bool]],
+) -> Tuple[
+    List[Tuple[Optional[List[Tuple]], Optional[bytes], Optional[str], float, int]],
+    ScanStats,
+    Optional[StageTimer],
+]:
+    # Counters are per batch so the parent can merge them without double counting
+    _worker_scanner.stats = ScanStats()
+    if _worker_scanner.timer is not None:
+        _worker_scanner.timer = StageTimer()
+    results = []
+    for path, expected_digest, hash_content in work:
+        start = time.perf_counter()
+        try:
+            rows, digest, size = _worker_scanner._read_and_scan(
+                Path(path), expected_digest, hash_content
+            )
+            results.append((rows, digest, None, time.perf_counter() - start, size))
+        except Exception as e:
+            results.append(([], None, str(e), time.perf_counter() - start, 0))
+    return results, _worker_scanner.stats, _worker_scanner.timer
+
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def run(scanner: CommentScanner, args: argparse.Namespace) -> int:
+    """Scan and report according to the parsed command line; return the exit status."""
+    if args.watch:
+        watch(scanner, args)
+        return 0
+    if args.history:
+        history(scanner, args)
+        return 0
+    if args.write_baseline:
+        from baseline import write_baseline
+
+        written = write_baseline(
+            args.write_baseline,
+            scanner.iter_comments(
+                args.filename,
+                args.case_sensitive,
+                args.complete_match,
+                on_error=scanner._print_error,
+            ),
+        )
+        scanner.console.print(
+            f"Baseline of {written} fingerprints written to {args.write_baseline}",
+            style="green",
+        )
+        return 0
+
+    if args.format == "counts":
+        from rich.console import Console
+
+        scanner.console = Console(stderr=True)
+        counts = scanner.count_comments(
+            args.filename, args.case_sensitive, args.complete_match
+        )
+        if scanner.gate_failure:
+            # Counts of an interrupted scan would be misleading
+            scanner._print_gate_failure()
+            return 1
+        lines = [f"{name}\t{count}" for name, count in counts.items()]
+        lines.append(f"total\t{sum(counts.values())}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                output.write("\n".join(lines) + "\n")
+        else:
+            print("\n".join(lines))
+        if scanner.truncated:
+            scanner._print_truncated()
+        if args.stats:
+            scanner.display_stats()
+            scanner.display_slow_files()
+        return 0
+
+    if args.format == "jsonl":
+        # Keep stdout for the JSON lines; messages go to stderr
+        from rich.console import Console
+
+        scanner.console = Console(stderr=True)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                scanner.stream_jsonl(
+                    output, args.filename, args.case_sensitive, args.complete_match
+                )
+        else:
+            try:
+                scanner.stream_jsonl(
+                    sys.stdout,
+                    args.filename,
+                    args.case_sensitive,
+                    args.complete_match,
+                )
+            except BrokenPipeError:
+                _silence_broken_pipe()
+                return 0
+        if args.stats:
+            scanner.display_stats()
+            scanner.display_slow_files()
+        if scanner.gate_failure:
+            scanner._print_gate_failure()
+            return 1
+        if scanner.fail_on and scanner.scan_error is not None:
+            # An incomplete scan must not pass a gate
+            return 1
+        if scanner.truncated:
+            scanner._print_truncated()
+        return 0
+
+    comments = scanner.scan_workspace(
+        filename_filter=args.filename,
+        case_sensitive=args.case_sensitive,
+        complete_match=args.complete_match,
     )
+
+    if args.stats:
+        scanner.display_stats()
+        scanner.display_slow_files()
+
+    if scanner.gate_failure:
+        # A failing gate only needs the verdict, not the table
+        scanner._print_gate_failure()
+        return 1
+    if scanner.fail_on and scanner.scan_error is not None:
+        # An incomplete scan must not pass a gate
+        return 1
+
+    if not comments:
+        scanner.console.print("No comments found!", style="yellow")
+        return 0
+
+    # Display in console
+    scanner.display_comments(comments)
+
+    # Export if requested
+    if args.export:
+        if not args.output:
+            raise ValueError("Output path (-o) is required when exporting")
+
+        if args.export == "pdf":
+            scanner.export_to_pdf(comments, args.output)
+        elif args.export == "xlsx":
+            scanner.export_to_excel(comments, args.output)
+
+        scanner.console.print(f"\nExported to {args.output}", style="green")
+    if scanner.truncated:
+        scanner._print_truncated()
+    return 0
+
+
+def history(scanner: CommentScanner, args: argparse.Namespace):
+    """Report comment counts for every commit of --history."""
+    from history import HistoryWalk
+
+    walk = HistoryWalk(
+        scanner,
+        args.filename,
+        args.case_sensitive,
+        args.complete_match,
+        changes=args.history_changes,
+    )
+    summaries = walk.walk(args.history)
+    if args.format == "jsonl":
+        from rich.console import Console
+
+        scanner.console = Console(stderr=True)
+        output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        try:
+            for summary in summaries:
+                output.write(json.dumps(summary.as_dict(), ensure_ascii=False) + "\n")
+                output.flush()
+        except BrokenPipeError:
+            _silence_broken_pipe()
+        finally:
+            summaries.close()
+            if output is not sys.stdout:
+                output.close()
+    else:
+        summaries = list(summaries)
+        if not summaries:
+            scanner.console.print("No commits in range!", style="yellow")
+            return
+        scanner.display_history(summaries)
+    if args.stats:
+        scanner.console.print(
+            f"History: {walk.commits} commits, {walk.blobs_scanned} distinct blobs "
+            f"scanned ({_format_size(scanner.stats.bytes_read)})",
+            style="dim",
+        )
+
+
+def watch(scanner: CommentScanner, args: argparse.Namespace):
+    """Run --watch until interrupted."""
+    filters = (args.filename, args.case_sensitive, args.complete_match)
+    try:
+        if args.format != "jsonl":
+            scanner.watch(*filters)
+            return
+        from rich.console import Console
+
+        scanner.console = Console(stderr=True)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                scanner.watch(*filters, output=output)
+        else:
+            try:
+                scanner.watch(*filters, output=sys.stdout)
+            except BrokenPipeError:
+                _silence_broken_pipe()
+    except KeyboardInterrupt:
+        pass
+
+
+def _fail_on_threshold(value: str) -> Tuple[str, int]:
+    """Parse MARKER[=N] for --fail-on."""
+    marker, _, count = value.rpartition("=") if "=" in value else (value, "", "1")
+    if marker not in config.COMMENT_MARKERS:
+        raise argparse.ArgumentTypeError(
+            f"unknown marker {marker!r} (choose from {', '.join(config.COMMENT_MARKERS)})"
+        )
+    try:
+        threshold = int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{count!r} is not a number") from None
+    if threshold < 1:
+        raise argparse.ArgumentTypeError("the threshold must be at least 1")
+    return marker, threshold
+
+
+def add_filter_arguments(parser: argparse.ArgumentParser) -> None:
+    """Marker and filename filters shared by the scan CLI and its subcommands."""
     parser.add_argument(
         "--skip",
         "-s",
@@ -454,20 +1606,6 @@ Examples:
         action="store_true",
         help="Include all markers (override default skip)",
     )
-    parser.add_argument(
-        "--no-context",
-        "-nc",
-        action="store_true",
-        help="Don't show context lines around comments",
-    )
-    parser.add_argument(
-        "--export",
-        "-e",
-        type=str,
-        choices=config.EXPORT_FORMATS,
-        help="Export format (pdf or xlsx)",
-    )
-    parser.add_argument("--output", "-o", type=str, help="Output file path for export")
 
     # Create a filename filter group
     filename_group = parser.add_argument_group("filename filtering")
@@ -490,46 +1628,322 @@ Examples:
         help="Make filename filter case sensitive (only with -f)",
     )
 
-    args = parser.parse_args()
 
-    # Update validation
+def check_filter_arguments(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> None:
     if args.case_sensitive and not args.filename:
         parser.error("--case-sensitive can only be used with --filename")
     if args.complete_match and not args.filename:
         parser.error("--complete-match can only be used with --filename")
 
-    try:
-        skip_markers = set() if args.include_all else set(args.skip)
-        scanner = CommentScanner(
-            args.workspace, skip_markers, show_context=not args.no_context
+
+def _silence_broken_pipe() -> None:
+    """After a BrokenPipeError on stdout, silence the flush error Python reports at exit."""
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def main():
+    # Subcommands; everything else is the flag-based scan CLI below
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # daemon imports CommentScanner from "main"; reuse this module rather than
+        # loading main.py a second time when it runs as a script
+        sys.modules.setdefault("main", sys.modules[__name__])
+        from daemon import main as serve
+
+        return serve(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "diff":
+        sys.modules.setdefault("main", sys.modules[__name__])
+        from revdiff import main as diff
+
+        sys.exit(diff(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        sys.modules.setdefault("main", sys.modules[__name__])
+        from client import main as query
+
+        sys.exit(query(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(
+        description="Scan TypeScript project comments",
+        epilog="""
+Examples:
+  %(prog)s                                    # Scan all files with default settings
+  %(prog)s -w /path/to/project               # Scan a specific workspace
+  %(prog)s -f test.py                        # Find comments in files containing 'test.py' (case insensitive)
+  %(prog)s -f test.py -c                     # Find comments in files named exactly 'test.py'
+  %(prog)s -f Test.py -C                     # Find comments with case-sensitive filename match
+  %(prog)s -f test.py -c -C                  # Find comments in files named exactly 'test.py' (case sensitive)
+  %(prog)s --skip TODO FIXME                 # Skip TODO and FIXME comments
+  %(prog)s -a                                # Include all comment types
+  %(prog)s -e pdf -o comments.pdf            # Export comments to PDF
+  %(prog)s -j 1                              # Scan serially in a single process
+  %(prog)s --format jsonl -nc                 # Stream comments as JSON lines to stdout
+  %(prog)s --profile --profile-out scan.prof  # Time each stage and dump cProfile data
+  %(prog)s --stats --slow-file-threshold 0.1  # Report files that take over 100 ms
+  %(prog)s --metrics-out /var/lib/node_exporter/overseer.prom  # For cron jobs
+  %(prog)s --since origin/main                # Only files changed on this branch
+  %(prog)s --staged -j 1                      # Comments added by the staged changes
+  %(prog)s --watch                            # Live table that follows file changes
+  %(prog)s serve &                           # Keep scans warm in a daemon
+  %(prog)s query -w /path/to/project -f api  # Ask the daemon (see query --help)
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--workspace", "-w", type=str, help="Path to the workspace directory"
+    )
+    add_filter_arguments(parser)
+    parser.add_argument(
+        "--no-context",
+        "-nc",
+        action="store_true",
+        help="Don't show context lines around comments",
+    )
+    parser.add_argument(
+        "--export",
+        "-e",
+        type=str,
+        choices=config.EXPORT_FORMATS,
+        help="Export format (pdf or xlsx)",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=config.OUTPUT_FORMATS,
+        default="table",
+        help="Console output format; jsonl streams one JSON object per comment, "
+        "counts prints the number of comments per marker",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=str,
+        help="Output file path for export (or for --format jsonl, default stdout)",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=available_cpus(),
+        help="Number of worker processes used for scanning (default: available CPUs)",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print scan statistics such as the content prefilter hit rate",
+    )
+    parser.add_argument(
+        "--since",
+        type=str,
+        metavar="REF",
+        help="Only scan files changed since the merge-base with REF, plus untracked files",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only report comments on lines added in the git index (pre-commit hooks)",
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        metavar="REV_RANGE",
+        help="Count comments at every commit of REV_RANGE (e.g. main, v1.0..HEAD, "
+        "or --history=--all) without checking anything out",
+    )
+    parser.add_argument(
+        "--history-changes",
+        action="store_true",
+        help="With --history, also list the comments each commit added and removed",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        metavar="FILE",
+        help="Only report comments whose fingerprint is not in the baseline FILE",
+    )
+    parser.add_argument(
+        "--write-baseline",
+        type=str,
+        metavar="FILE",
+        help="Write the fingerprints of every reported comment to FILE and exit",
+    )
+    parser.add_argument(
+        "--fail-on",
+        type=_fail_on_threshold,
+        action="append",
+        metavar="MARKER[=N]",
+        help="Stop and exit with status 1 as soon as N (default 1) MARKER comments "
+        "are found; repeatable (e.g. --fail-on FIXME --fail-on TODO=50)",
+    )
+    parser.add_argument(
+        "--max-results",
+        type=int,
+        metavar="N",
+        help="Stop scanning after N comments",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and update the results as files change "
+        "(with --format jsonl, emit change events)",
+    )
+    parser.add_argument(
+        "--slow-file-threshold",
+        type=float,
+        metavar="SECONDS",
+        help="Report each file that takes at least SECONDS to scan as it is found",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print how long each stage (walk, read, parse, render, ...) took",
+    )
+    parser.add_argument(
+        "--profile-out",
+        type=str,
+        metavar="FILE",
+        help="Run under cProfile and write the stats to FILE (e.g. scan.prof)",
+    )
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        metavar="FILE",
+        help="Write Prometheus text-format metrics of the run to FILE (e.g. overseer.prom)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or update the incremental scan cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help=f"Scan cache directory (default: <workspace>/{config.CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-backend",
+        choices=config.CACHE_BACKENDS,
+        default="auto",
+        help="git reuses results by git blob ID across branches, worktrees and CI "
+        "runners sharing --cache-dir; stat keys them by path only; auto picks git "
+        "inside a work tree (default: auto)",
+    )
+
+    args = parser.parse_args()
+
+    # Update validation
+    check_filter_arguments(parser, args)
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.slow_file_threshold is not None and args.slow_file_threshold < 0:
+        parser.error("--slow-file-threshold must not be negative")
+    if args.format != "table" and args.export:
+        parser.error(f"--export cannot be combined with --format {args.format}")
+    if args.watch and args.export:
+        parser.error("--export cannot be combined with --watch")
+    if args.watch and args.since:
+        parser.error("--since cannot be combined with --watch")
+    if args.staged and (args.since or args.watch):
+        parser.error("--staged cannot be combined with --since or --watch")
+    if args.history and (args.since or args.staged or args.watch or args.export):
+        parser.error(
+            "--history cannot be combined with --since, --staged, --watch or --export"
         )
-        comments = scanner.scan_workspace(
-            filename_filter=args.filename,
-            case_sensitive=args.case_sensitive,
-            complete_match=args.complete_match,
+    if args.format == "counts" and (args.watch or args.history):
+        parser.error("--format counts cannot be combined with --watch or --history")
+    if args.write_baseline and (
+        args.since or args.staged or args.watch or args.history or args.baseline
+    ):
+        parser.error(
+            "--write-baseline cannot be combined with --since, --staged, --watch, "
+            "--history or --baseline"
         )
+    if args.baseline and args.history:
+        parser.error("--baseline cannot be combined with --history")
+    if (args.fail_on or args.max_results is not None) and (
+        args.watch or args.history or args.write_baseline
+    ):
+        parser.error(
+            "--fail-on and --max-results cannot be combined with --watch, --history "
+            "or --write-baseline"
+        )
+    if args.max_results is not None and args.max_results < 1:
+        parser.error("--max-results must be at least 1")
+    if args.fail_on and not args.include_all:
+        skipped = sorted({marker for marker, _ in args.fail_on} & set(args.skip))
+        if skipped:
+            parser.error(
+                f"--fail-on {skipped[0]} would never trigger because {skipped[0]} is "
+                "skipped; pass --include-all or --skip without it"
+            )
+    if args.history_changes and not args.history:
+        parser.error("--history-changes can only be used with --history")
 
-        if not comments:
-            scanner.console.print("No comments found!", style="yellow")
-            return
+    try:
+        skip_markers = set() if args.include_all else set(args.skip)
+        baseline = None
+        if args.baseline:
+            from baseline import load_baseline
 
-        # Display in console
-        scanner.display_comments(comments)
+            baseline = load_baseline(args.baseline)
+        only_paths = None
+        if args.since:
+            from vcs import changed_files
 
-        # Export if requested
-        if args.export:
-            if not args.output:
-                raise ValueError("Output path (-o) is required when exporting")
+            only_paths = changed_files(
+                Path(args.workspace or config.DEFAULT_WORKSPACE).resolve(), args.since
+            )
+        scanner = CommentScanner(
+            args.workspace,
+            skip_markers,
+            show_context=not args.no_context,
+            jobs=args.jobs,
+            use_cache=not args.no_cache,
+            cache_dir=args.cache_dir,
+            cache_backend=args.cache_backend,
+            # Stage durations are part of the exported metrics
+            profile=args.profile or bool(args.metrics_out),
+            slow_file_threshold=args.slow_file_threshold,
+            # Watch mode rescans from memory instead of the on-disk cache
+            cache=MemoryCache() if args.watch else None,
+            only_paths=only_paths,
+            staged=args.staged,
+            baseline=baseline,
+            fail_on=dict(args.fail_on) if args.fail_on else None,
+            max_results=args.max_results,
+        )
 
-            if args.export == "pdf":
-                scanner.export_to_pdf(comments, args.output)
-            elif args.export == "xlsx":
-                scanner.export_to_excel(comments, args.output)
+        start = time.perf_counter()
+        if args.profile_out:
+            import cProfile
 
-            scanner.console.print(f"\nExported to {args.output}", style="green")
+            profiler = cProfile.Profile()
+            try:
+                status = profiler.runcall(run, scanner, args)
+            finally:
+                profiler.dump_stats(args.profile_out)
+        else:
+            status = run(scanner, args)
+        duration = time.perf_counter() - start
+        if args.profile:
+            scanner.display_profile(duration)
+        if args.metrics_out:
+            from metrics import render_metrics, write_metrics
+
+            write_metrics(args.metrics_out, render_metrics(scanner, duration))
+        if args.profile_out:
+            scanner.console.print(
+                f"cProfile data written to {args.profile_out}", style="dim"
+            )
+        if status:
+            sys.exit(status)
 
     except Exception as e:
-        Console().print(f"Error: {str(e)}", style="red")
+        from rich.console import Console
+
+        Console().print(f"Error: {str(e)}", style="red", markup=False)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import config
+
+# Everything str.strip() removes except "\n", as UTF-8 byte sequences. Used
+# between a delimiter and a marker so the byte-level prefilter agrees exactly
+# with the stripping done on decoded lines. All such characters are below U+3001.
+_INLINE_SPACE = b"(?:%s)" % b"|".join(
+    re.escape(chr(code).encode("utf-8"))
+    for code in range(0x3001)
+    if chr(code).isspace() and code != 0x0A
+)
+
+# A carriage return not followed by a line feed (old Mac line endings)
+_LONE_CR = re.compile(rb"\r(?!\n)")
+
+
+def decode_line(raw: bytes) -> str:
+    """Decode one line, falling back to replacement characters for invalid UTF-8."""
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("utf-8", "replace")
+
+
+def normalize_newlines(data: bytes) -> bytes:
+    """Turn lone "\r" line endings into "\n" like text-mode reads do.
+
+    "\r\n" is left alone: the "\r" ends up at the end of the line and is removed
+    when the line is stripped.
+    """
+    if b"\r" in data and _LONE_CR.search(data):
+        return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return data
+
+
+def count_lines(data: bytes) -> int:
+    """Number of lines, counting a final line without a trailing newline."""
+    if not data:
+        return 0
+    return data.count(b"\n") + (not data.endswith(b"\n"))
+
+
+class CommentMatcher:
+    """Comment delimiters and markers of one language, compiled once.
+
+    Instead of probing every line for every delimiter, a single alternation
+    regex is run over the whole (undecoded) buffer and only the lines it lands
+    on are decoded and handed to the comment state machine.
+    """
+
+    def __init__(self, comment_patterns: Dict):
+        self.single_patterns = comment_patterns.get("single", [])
+        self.multiline_pattern = comment_patterns.get("multiline")
+
+        delimiters = set(self.single_patterns)
+        if self.multiline_pattern:
+            delimiters.update(self.multiline_pattern)
+        # Longest first so e.g. "/*" is preferred over "/" if both were delimiters
+        self.delimiter_re = re.compile(
+            b"|".join(
+                re.escape(delimiter.encode("utf-8"))
+                for delimiter in sorted(delimiters, key=len, reverse=True)
+            )
+        )
+        # Alternation order follows COMMENT_MARKERS, like the startswith loop it
+        # replaces; one group per marker so lastindex gives the marker id
+        markers = "|".join(re.escape(marker) for marker in config.COMMENT_MARKERS)
+        self.marker_re = re.compile(
+            "|".join(f"({re.escape(marker)})" for marker in config.COMMENT_MARKERS)
+        )
+
+        # A comment can only be reported if an opening delimiter is followed, after
+        # optional whitespace on the same line, by a marker. Searching for that pair
+        # rejects files where "!" or "?" merely appear somewhere in the code.
+        openers = set(self.single_patterns)
+        if self.multiline_pattern:
+            openers.add(self.multiline_pattern[0])
+        self.prefilter_re = re.compile(
+            b"(?:%s)%s*(?:%s)"
+            % (
+                b"|".join(
+                    re.escape(opener.encode("utf-8"))
+                    for opener in sorted(openers, key=len, reverse=True)
+                ),
+                _INLINE_SPACE,
+                markers.encode("utf-8"),
+            )
+        )
+
+    def might_contain_comments(self, content: bytes) -> bool:
+        return self.prefilter_re.search(content) is not None
+
+    def candidate_lines(self, content: bytes) -> Iterator[Tuple[int, str]]:
+        """Yield (line index, decoded stripped line) for lines containing a delimiter."""
+        search = self.delimiter_re.search
+        line_idx = 0
+        line_start = 0
+        pos = 0
+        while True:
+            match = search(content, pos)
+            if match is None:
+                return
+            start = match.start()
+            line_idx += content.count(b"\n", line_start, start)
+            line_start = content.rfind(b"\n", 0, start) + 1
+            line_end = content.find(b"\n", start)
+            if line_end == -1:
+                line_end = len(content)
+            yield line_idx, decode_line(content[line_start:line_end]).strip()
+            pos = line_end + 1
+
+    def match_marker(self, comment_text: str):
+        """Return (marker id, marker length) if comment_text starts with a marker."""
+        match = self.marker_re.match(comment_text)
+        return (match.lastindex - 1, match.end()) if match else None
+
+    def scan(
+        self,
+        content: bytes,
+        stats=None,
+        start_lines: Optional[List[int]] = None,
+    ) -> List[Tuple[str, str, int]]:
+        """Return (marker id, text, line index) for every marked comment in content.
+
+        The line index is where the comment ends. content must have gone through
+        normalize_newlines(). If a ScanStats is given, the examined and
+        fast-rejected lines and multiline blocks are added to it. If start_lines
+        is given, the line index where each returned comment starts is appended
+        to it.
+        """
+        hits = []
+        block_start = 0
+        examined = 0
+        blocks = 0
+        single_patterns = self.single_patterns
+        multiline_pattern = self.multiline_pattern
+        in_multiline_comment = False
+        multiline_content = []
+
+        for line_num, stripped_line in self.candidate_lines(content):
+            examined += 1
+            # Handle multiline comments
+            if multiline_pattern:
+                start_pattern, end_pattern = multiline_pattern
+
+                if (
+                    start_pattern in stripped_line
+                    and end_pattern
+                    in stripped_line[
+                        stripped_line.find(start_pattern) + len(start_pattern) :
+                    ]
+                ):
+                    comment_text = stripped_line[
+                        stripped_line.find(start_pattern)
+                        + len(start_pattern) : stripped_line.rfind(end_pattern)
+                    ].strip()
+                    if self._add_hit(hits, comment_text, line_num):
+                        if start_lines is not None:
+                            start_lines.append(line_num)
+                    continue
+
+                if start_pattern in stripped_line and not in_multiline_comment:
+                    in_multiline_comment = True
+                    blocks += 1
+                    block_start = line_num
+                    multiline_content = [
+                        stripped_line[
+                            stripped_line.find(start_pattern) + len(start_pattern) :
+                        ].strip()
+                    ]
+                    continue
+
+                if in_multiline_comment:
+                    if end_pattern in stripped_line:
+                        in_multiline_comment = False
+                        multiline_content.append(
+                            stripped_line[: stripped_line.find(end_pattern)].strip()
+                        )
+                        if self._add_hit(hits, " ".join(multiline_content), line_num):
+                            if start_lines is not None:
+                                start_lines.append(block_start)
+                        multiline_content = []
+                    else:
+                        multiline_content.append(stripped_line)
+                    continue
+
+            # Handle single-line comments
+            for pattern in single_patterns:
+                if pattern in stripped_line:
+                    comment_text = stripped_line[
+                        stripped_line.find(pattern) + len(pattern) :
+                    ].strip()
+                    if self._add_hit(hits, comment_text, line_num):
+                        if start_lines is not None:
+                            start_lines.append(line_num)
+                    break
+
+        if stats is not None:
+            lines = count_lines(content)
+            stats.lines_examined += examined
+            stats.lines_fast_rejected += lines - examined
+            stats.multiline_blocks += blocks
+        return hits
+
+    def _add_hit(self, hits: List[Tuple], comment_text: str, line_num: int) -> bool:
+        marker = self.match_marker(comment_text)
+        if marker is None:
+            return False
+        marker_id, marker_length = marker
+        hits.append((marker_id, comment_text[marker_length:].strip(), line_num))
+        return True
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from records import marker_names
+
+if TYPE_CHECKING:
+    from main import CommentScanner
+
+PREFIX = "overseer"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class _Writer:
+    def __init__(self, workspace: str):
+        self.workspace = workspace
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples) -> None:
+        """Add one metric family; samples are (extra labels, value) pairs."""
+        name = f"{PREFIX}_{name}"
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            # Every series carries the workspace so one textfile directory can
+            # hold the output of scans over many repositories
+            labels = {"workspace": self.workspace, **labels}
+            self.lines.append(f"{name}{{{_labels(labels)}}} {_format_value(value)}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(
+    scanner: "CommentScanner",
+    duration: float,
+    timestamp: Optional[float] = None,
+) -> str:
+    """Prometheus text exposition of the scanner's last scan.
+
+    Every value describes a single run, so all families are gauges; alert on
+    their change over time (e.g. delta() of the TODO count).
+    """
+    stats = scanner.stats
+    writer = _Writer(str(scanner.workspace_path))
+    writer.metric(
+        "comments",
+        "gauge",
+        "Comments reported, by marker (skipped markers report 0).",
+        (
+            ({"marker": name}, count)
+            for name, count in stats.comments_by_marker(marker_names()).items()
+        ),
+    )
+    writer.metric(
+        "directory_comments",
+        "gauge",
+        'Comments reported, by top-level directory ("." is the workspace root).',
+        (
+            ({"directory": directory or "."}, count)
+            for directory, count in sorted(stats.directory_comments.items())
+        ),
+    )
+    writer.metric(
+        "files_scanned",
+        "gauge",
+        "Files scanned, cache hits included.",
+        [({}, scanner.file_timings.files)],
+    )
+    writer.metric(
+        "bytes_read", "gauge", "Bytes read from disk.", [({}, stats.bytes_read)]
+    )
+    if scanner.timer is not None:
+        writer.metric(
+            "stage_duration_seconds",
+            "gauge",
+            "Time spent per stage; worker stages are summed across processes.",
+            (
+                ({"stage": stage}, seconds)
+                for stage, seconds in sorted(scanner.timer.seconds.items())
+            ),
+        )
+    writer.metric(
+        "run_duration_seconds",
+        "gauge",
+        "Wall time of the whole run.",
+        [({}, duration)],
+    )
+    if stats.cache_lookups:
+        writer.metric(
+            "cache_hit_ratio",
+            "gauge",
+            "Share of cache lookups answered without parsing the file.",
+            [({}, stats.cache_hit_ratio)],
+        )
+    writer.metric(
+        "last_run_timestamp_seconds",
+        "gauge",
+        "Unix time the run finished.",
+        [({}, time.time() if timestamp is None else timestamp)],
+    )
+    return writer.text()
+
+
+def write_metrics(path: str, text: str) -> None:
+    """Write text to path atomically, so collectors never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=".", suffix=".prom.tmp", text=True
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600; the collector may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,127 @@
+import hashlib
+import os
+from typing import Dict, List, Tuple
+
+import config
+
+_marker_names: Tuple[Dict[str, str], Tuple[str, ...]] = ({}, ())
+
+
+def marker_names() -> Tuple[str, ...]:
+    """Markers in COMMENT_MARKERS order; a marker id is an index into this tuple."""
+    global _marker_names
+    if _marker_names[0] is not config.COMMENT_MARKERS:
+        _marker_names = (config.COMMENT_MARKERS, tuple(config.COMMENT_MARKERS))
+    return _marker_names[1]
+
+
+def normalize_text(text: str) -> str:
+    """Comment text with runs of whitespace collapsed, for matching across revisions."""
+    return " ".join(text.split())
+
+
+def fingerprint(rel_path: str, marker: str, text: str) -> str:
+    """Stable ID of a comment from its file, marker and normalized text.
+
+    The line is left out so edits elsewhere in the file keep the ID, and the path
+    always uses "/" so baselines are portable between platforms.
+    """
+    key = "\0".join((rel_path.replace(os.sep, "/"), marker, normalize_text(text)))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def walk_order(rel_path: str) -> List[Tuple[int, str]]:
+    """Sort key giving iter_files' order: a directory's files before its subdirectories."""
+    *dirs, name = rel_path.split(os.sep)
+    return [(1, part) for part in dirs] + [(0, name)]
+
+
+class FileTable:
+    """Interned relative paths, so comments refer to their file by a small id."""
+
+    __slots__ = ("paths", "_ids")
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, rel_path: str) -> int:
+        file_id = self._ids.get(rel_path)
+        if file_id is None:
+            file_id = self._ids[rel_path] = len(self.paths)
+            self.paths.append(rel_path)
+        return file_id
+
+    def __getitem__(self, file_id: int) -> str:
+        return self.paths[file_id]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+
+class Comment:
+    """A single marked comment.
+
+    Supports comment["type"], comment["text"], comment["file"] and comment["line"]
+    so code written against the old per-comment dicts keeps working.
+    """
+
+    __slots__ = ("marker_id", "text", "file_id", "line", "files")
+
+    _KEYS = ("type", "text", "file", "line")
+
+    def __init__(
+        self, marker_id: int, text: str, file_id: int, line: int, files: FileTable
+    ):
+        self.marker_id = marker_id
+        self.text = text
+        self.file_id = file_id
+        self.line = line
+        self.files = files
+
+    @property
+    def type(self) -> str:
+        return marker_names()[self.marker_id]
+
+    @property
+    def file(self) -> str:
+        return self.files[self.file_id]
+
+    @property
+    def fingerprint(self) -> str:
+        return fingerprint(self.file, self.type, self.text)
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self._KEYS else default
+
+    def as_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self._KEYS}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Comment):
+            return NotImplemented
+        return (self.type, self.text, self.file, self.line) == (
+            other.type,
+            other.text,
+            other.file,
+            other.line,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.type, self.text, self.file, self.line))
+
+    def __repr__(self) -> str:
+        return (
+            f"Comment(type={self.type!r}, text={self.text!r}, "
+            f"file={self.file!r}, line={self.line})"
+        )
+
+
+def comments_to_dicts(comments) -> List[Dict]:
+    """Adapter for callers that need plain dicts, e.g. DataFrame construction."""
+    return [comment.as_dict() for comment in comments]
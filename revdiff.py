@@ -0,0 +1,146 @@
+"""Comments added, removed and moved between two git revisions.
+
+    python main.py diff v1.2 v1.3
+    python main.py diff origin/main HEAD --format jsonl -f api
+
+Both revisions are read from the object database (see history.HistoryWalk),
+so nothing is checked out and only the trees and blobs that differ are read.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict
+
+import config
+from history import HistoryWalk, RevisionDiff
+from main import (
+    CommentScanner,
+    _silence_broken_pipe,
+    add_filter_arguments,
+    check_filter_arguments,
+)
+from records import Comment
+
+
+def _records(diff: RevisionDiff):
+    """(change, comment, old line or None), ordered by file and line."""
+    changes = [("added", comment, None) for comment in diff.added]
+    changes += [("removed", comment, None) for comment in diff.removed]
+    changes += [("moved", comment, line) for line, comment in diff.moved]
+    return sorted(changes, key=lambda change: (change[1].file, change[1].line))
+
+
+def _to_json_record(change: str, comment: Comment, old_line) -> Dict:
+    record = {"change": change, **comment.as_dict()}
+    if old_line is not None:
+        record["old_line"] = old_line
+    return record
+
+
+def display_diff(scanner: CommentScanner, diff: RevisionDiff, title: str):
+    from rich.markup import escape
+    from rich.table import Table
+
+    styles = {"added": "green", "removed": "red", "moved": "blue"}
+    table = Table(title=title, show_lines=True)
+    table.add_column("Change", style="bold")
+    table.add_column("Type", style="bold")
+    table.add_column("Comment")
+    table.add_column("File", style="dim")
+    table.add_column("Line", style="dim")
+    for change, comment, old_line in _records(diff):
+        line = str(comment.line) if old_line is None else f"{old_line} → {comment.line}"
+        table.add_row(
+            change,
+            config.COMMENT_MARKERS[comment.type],
+            escape(comment.text),
+            escape(comment.file),
+            line,
+            style=styles[change],
+        )
+    scanner.console.print(table)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="main.py diff",
+        description="List the comments added, removed and moved between two git "
+        "revisions, without checking either out",
+    )
+    parser.add_argument("rev_a", help="Old revision (e.g. v1.2)")
+    parser.add_argument("rev_b", help="New revision (e.g. v1.3 or HEAD)")
+    parser.add_argument(
+        "--workspace", "-w", type=str, help="Path to the workspace directory"
+    )
+    add_filter_arguments(parser)
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["table", "jsonl"],
+        default="table",
+        help="table, or jsonl with one JSON object per changed comment",
+    )
+    parser.add_argument(
+        "--output", "-o", type=str, help="Output file for --format jsonl"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print how many blobs were scanned",
+    )
+    args = parser.parse_args(argv)
+
+    check_filter_arguments(parser, args)
+
+    skip_markers = set() if args.include_all else set(args.skip)
+    scanner = CommentScanner(args.workspace, skip_markers)
+    if args.format == "jsonl":
+        from rich.console import Console
+
+        scanner.console = Console(stderr=True)
+    try:
+        walk = HistoryWalk(
+            scanner, args.filename, args.case_sensitive, args.complete_match
+        )
+        diff = walk.compare(args.rev_a, args.rev_b)
+    except Exception as e:
+        scanner.console.print(f"Error: {e}", style="red", markup=False)
+        return 1
+
+    if args.format == "jsonl":
+        output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        try:
+            for change in _records(diff):
+                output.write(
+                    json.dumps(_to_json_record(*change), ensure_ascii=False) + "\n"
+                )
+            output.flush()
+        except BrokenPipeError:
+            _silence_broken_pipe()
+        finally:
+            if output is not sys.stdout:
+                output.close()
+    elif diff.added or diff.removed or diff.moved:
+        from rich.markup import escape
+
+        display_diff(
+            scanner,
+            diff,
+            escape(f"Comments changed from {args.rev_a} to {args.rev_b}"),
+        )
+    else:
+        scanner.console.print("No comments changed!", style="yellow")
+    if args.stats or args.format != "jsonl":
+        scanner.console.print(
+            f"{len(diff.added)} added, {len(diff.removed)} removed, "
+            f"{len(diff.moved)} moved",
+            style="dim",
+        )
+    if args.stats:
+        scanner.console.print(f"{walk.blobs_scanned} blobs scanned", style="dim")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
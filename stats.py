@@ -0,0 +1,206 @@
+import heapq
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class ScanStats:
+    """Counters collected while scanning, mergeable across worker processes."""
+
+    # Plain slots rather than a dataclass: importing dataclasses costs more CLI
+    # start-up time than the whole --help path
+    __slots__ = (
+        # Directory entries (files and directories) listed by the walk, or the
+        # paths given instead of a walk (only_paths, --staged)
+        "entries_enumerated",
+        # Entries skipped because their name starts with "."
+        "files_hidden",
+        # Entries matched by .gitignore; an ignored directory counts once
+        "files_gitignored",
+        # Files whose extension is not in FILE_PATTERNS
+        "files_unmatched",
+        # Files FILE_PATTERNS let through but COMMENT_PATTERNS has no syntax for;
+        # they are walked and then dropped without being read
+        "files_unsupported",
+        # Files looked up in the scan cache, and those whose comments it supplied
+        # without a parse (unchanged stat, or an unchanged hash after a touch)
+        "cache_lookups",
+        "files_cached",
+        # Bytes read from disk
+        "bytes_read",
+        # Files whose content went through the delimiter+marker prefilter
+        "prefilter_checked",
+        # Files the prefilter let through to the line parser
+        "prefilter_passed",
+        # Lines of every file handed to the scanner, prefilter rejects included
+        "lines_read",
+        # Lines of parsed files that contain no delimiter and were never decoded
+        "lines_fast_rejected",
+        # Lines decoded and run through the comment state machine
+        "lines_examined",
+        # Multiline comments opened without being closed on the same line
+        "multiline_blocks",
+        # Marker id -> comments found with that marker, skipped markers included
+        "marker_matches",
+        # Marker id -> comments reported, after skipped markers and the baseline
+        "marker_comments",
+        # Top-level directory ("" for the workspace root) -> reported comments
+        "directory_comments",
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+        self.marker_matches: Dict[int, int] = {}
+        self.marker_comments: Dict[int, int] = {}
+        self.directory_comments: Dict[str, int] = {}
+
+    @property
+    def prefilter_rejected(self) -> int:
+        return self.prefilter_checked - self.prefilter_passed
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        if not self.cache_lookups:
+            return 0.0
+        return self.files_cached / self.cache_lookups
+
+    @property
+    def prefilter_hit_rate(self) -> float:
+        if not self.prefilter_checked:
+            return 0.0
+        return self.prefilter_passed / self.prefilter_checked
+
+    def count_markers(self, rows: Iterable[Tuple]) -> None:
+        """Count (marker id, text, line) rows per marker."""
+        matches = self.marker_matches
+        for row in rows:
+            matches[row[0]] = matches.get(row[0], 0) + 1
+
+    def matches_by_marker(self, names: List[str]) -> Dict[str, int]:
+        """Map marker names (indexed by marker id) to match counts, zeros included."""
+        return {name: self.marker_matches.get(i, 0) for i, name in enumerate(names)}
+
+    def comments_by_marker(self, names: List[str]) -> Dict[str, int]:
+        """Like matches_by_marker, for reported comments only."""
+        return {name: self.marker_comments.get(i, 0) for i, name in enumerate(names)}
+
+    def merge(self, other: "ScanStats") -> None:
+        for name in self.__slots__:
+            value = getattr(other, name)
+            if isinstance(value, dict):
+                counts = getattr(self, name)
+                for key, count in value.items():
+                    counts[key] = counts.get(key, 0) + count
+            else:
+                setattr(self, name, getattr(self, name) + value)
+
+
+class StageTimer:
+    """Wall time and call counts per pipeline stage, from a monotonic clock.
+
+    Scanners only hold one while profiling; with timer = None the hot paths pay
+    a single "is not None" check.
+    """
+
+    __slots__ = ("seconds", "calls")
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float, calls: int = 1) -> None:
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def merge(self, other: "StageTimer") -> None:
+        for stage, seconds in other.seconds.items():
+            self.add(stage, seconds, other.calls[stage])
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, perf_counter() - start)
+
+    def timed_iter(self, stage: str, iterator: Iterator) -> Iterator:
+        """Wrap an iterator, charging the time spent producing each item to stage."""
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.add(stage, perf_counter() - start, 0)
+                    return
+                self.add(stage, perf_counter() - start)
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def timed_call(self, stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, perf_counter() - start)
+
+        return timed
+
+
+# Upper bounds, in seconds, of the per-file latency histogram buckets; the last
+# bucket is open-ended
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+
+class FileTimings:
+    """Per-file scan latency: a fixed-bucket histogram plus the N slowest files.
+
+    Memory stays bounded by top_n however large the workspace is.
+    """
+
+    __slots__ = ("top_n", "buckets", "files", "seconds", "bytes", "_slowest")
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.files = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        # Min-heap of (seconds, size, path) holding the slowest files seen so far
+        self._slowest: List[Tuple[float, int, str]] = []
+
+    def add(self, path: str, seconds: float, size: Optional[int]) -> None:
+        size = size or 0
+        self.files += 1
+        self.seconds += seconds
+        self.bytes += size
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, (seconds, size, path))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, size, path))
+
+    def slowest(self) -> List[Tuple[float, int, str]]:
+        """(seconds, size, path) of the slowest files, slowest first."""
+        return sorted(self._slowest, reverse=True)
+
+    def histogram(self) -> List[Tuple[str, int]]:
+        """(bucket label, file count) pairs in increasing latency order."""
+        labels = []
+        lower = "0"
+        for upper in LATENCY_BUCKETS:
+            labels.append(f"{lower}-{_format_seconds(upper)}")
+            lower = _format_seconds(upper)
+        labels.append(f">{lower}")
+        return list(zip(labels, self.buckets))
+
+
+def _format_seconds(seconds: float) -> str:
+    return f"{seconds * 1000:g} ms" if seconds < 1 else f"{seconds:g} s"
@@ -0,0 +1,154 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from matcher import CommentMatcher, normalize_newlines  # noqa: E402
+from records import marker_names  # noqa: E402
+
+
+def reference_scan(data: bytes, extension: str):
+    """The per-line loop CommentMatcher replaced, as (marker, text, line) tuples.
+
+    Lines are split like a text-mode read (universal newlines) and, as the
+    scanner has done since it stopped skipping whole files, invalid UTF-8 is
+    decoded with replacement characters.
+    """
+    patterns = config.COMMENT_PATTERNS[extension]
+    single_patterns = patterns.get("single", [])
+    multiline_pattern = patterns.get("multiline")
+    text = data.decode("utf-8", "replace")
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+    hits = []
+
+    def add(comment_text, line_num):
+        for marker in config.COMMENT_MARKERS:
+            if comment_text.startswith(marker):
+                hits.append((marker, comment_text[len(marker) :].strip(), line_num))
+                break
+
+    in_multiline_comment = False
+    multiline_content = []
+    for line_num, line in enumerate(lines):
+        stripped_line = line.strip()
+        if not stripped_line:
+            continue
+        if not any(pattern in stripped_line for pattern in single_patterns) and not (
+            multiline_pattern
+            and (
+                multiline_pattern[0] in stripped_line
+                or multiline_pattern[1] in stripped_line
+            )
+        ):
+            continue
+
+        if multiline_pattern:
+            start_pattern, end_pattern = multiline_pattern
+            if (
+                start_pattern in stripped_line
+                and end_pattern
+                in stripped_line[
+                    stripped_line.find(start_pattern) + len(start_pattern) :
+                ]
+            ):
+                add(
+                    stripped_line[
+                        stripped_line.find(start_pattern)
+                        + len(start_pattern) : stripped_line.rfind(end_pattern)
+                    ].strip(),
+                    line_num,
+                )
+                continue
+            if start_pattern in stripped_line and not in_multiline_comment:
+                in_multiline_comment = True
+                multiline_content = [
+                    stripped_line[
+                        stripped_line.find(start_pattern) + len(start_pattern) :
+                    ].strip()
+                ]
+                continue
+            if in_multiline_comment:
+                if end_pattern in stripped_line:
+                    in_multiline_comment = False
+                    multiline_content.append(
+                        stripped_line[: stripped_line.find(end_pattern)].strip()
+                    )
+                    add(" ".join(multiline_content), line_num)
+                    multiline_content = []
+                else:
+                    multiline_content.append(stripped_line)
+                continue
+
+        for pattern in single_patterns:
+            if pattern in stripped_line:
+                add(
+                    stripped_line[stripped_line.find(pattern) + len(pattern) :].strip(),
+                    line_num,
+                )
+                break
+    return hits
+
+
+def matcher_scan(data: bytes, extension: str):
+    """CommentMatcher's hits, including the prefilter the scanner runs first."""
+    matcher = CommentMatcher(config.COMMENT_PATTERNS[extension])
+    if not matcher.might_contain_comments(data):
+        return []
+    names = marker_names()
+    return [
+        (names[marker_id], text, line)
+        for marker_id, text, line in matcher.scan(normalize_newlines(data))
+    ]
+
+
+CASES = {
+    "single line": ("js", b"const a = 1; // TODO: tidy\n// FIXME broken\n"),
+    "no trailing newline": ("py", b"x = 1\n# NOTE: last line"),
+    "markers in code only": ("js", b"if (!a) { b = a ? 1 : 2; } // plain\n"),
+    "multiline block": (
+        "js",
+        b"/*\n * TODO: spans\n * lines\n */\nx();\n/* FIXME: one line */\n",
+    ),
+    "multiline opened with marker": ("c", b"/* TODO: start\n   more */\nint x;\n"),
+    "python docstring": ("py", b'def f():\n    """TODO: doc\n    more\n    """\n'),
+    "ruby block": ("rb", b"=begin\nREVIEW: this\n=end\n# ? why\n"),
+    "unterminated block": ("js", b"/* TODO: never closed\n// FIXME: inside\n"),
+    "crlf": ("js", b"// TODO: one\r\n// FIXME: two\r\n/* ! three\r\n */\r\n"),
+    "lone cr": ("js", b"// TODO: one\r// FIXME: two\rx = 1;\r"),
+    "mixed endings": ("py", b"# TODO: a\r\n# FIXME: b\r# NOTE: c\n"),
+    "invalid utf-8": ("js", b"// TODO: caf\xe9\n\xff\xfe// FIXME: after\n"),
+    "invalid utf-8 in block": ("js", b"/* TODO: \xc3\n\x80 rest */\n"),
+    "nbsp before marker": ("js", "//\u00a0TODO: nbsp\n".encode("utf-8")),
+    "ideographic space": ("py", "#\u3000FIXME: wide\n".encode("utf-8")),
+    "control separators": ("js", "//\x1c\x1dTODO: sep\n//\x85? nel\n".encode("utf-8")),
+    "unicode space line": ("js", "\u2028// TODO: after ls\n".encode("utf-8")),
+    "tabs": ("js", b"\t\t//\tTODO:\ttabbed\n"),
+    "default syntax": ("default", b"// REVIEW: here\n/* not a delimiter */\n"),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_matches_reference(name: str):
+    extension, data = CASES[name]
+    assert matcher_scan(data, extension) == reference_scan(data, extension)
+
+
+def test_matches_reference_on_random_inputs():
+    tokens = [
+        "//", "/*", "*/", "#", '"""', "=begin", "=end", "TODO", "FIXME", "!",
+        "?", "NOTE", "REVIEW", " ", "x", "\n", "\n", "\r\n", "\r", "\t", "\u00e9",
+        "\u00a0", "\u3000", "\x1c", "\x85",
+    ]  # fmt: skip
+    rnd = random.Random(0)
+    for _ in range(2000):
+        extension = rnd.choice(["py", "js", "rb", "default"])
+        data = "".join(rnd.choice(tokens) for _ in range(rnd.randint(0, 60)))
+        data = data.encode("utf-8")
+        if rnd.random() < 0.1:
+            data += b"\xff"
+        assert matcher_scan(data, extension) == reference_scan(data, extension), data
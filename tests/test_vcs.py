@@ -0,0 +1,75 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vcs import staged_additions  # noqa: E402
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    git(tmp_path, "init", "-q")
+    (tmp_path / "gone.py").write_text("# TODO: old\n")
+    (tmp_path / "before.py").write_text("x = 1\ny = 2\nz = 3\n")
+    (tmp_path / "keep.py").write_text("a = 1\n")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "init")
+    return tmp_path
+
+
+def test_staged_additions(repo: Path):
+    (repo / "my file.py").write_text("# FIXME: spaced\n")
+    (repo / "tab\there.py").write_text("# TODO: quoted\n")
+    (repo / "gone.py").unlink()
+    git(repo, "mv", "before.py", "after.py")
+    (repo / "after.py").write_text("x = 1\ny = 2\nz = 3\n# NOTE: renamed\n")
+    (repo / "keep.py").write_text("a = 1\n# TODO: appended\n")
+    git(repo, "add", "-A")
+
+    additions = staged_additions(repo)
+
+    assert additions == {
+        "my file.py": [(1, b"# FIXME: spaced")],
+        "tab\there.py": [(1, b"# TODO: quoted")],
+        "after.py": [(4, b"# NOTE: renamed")],
+        "keep.py": [(2, b"# TODO: appended")],
+    }
+
+
+def test_staged_additions_in_subdirectory(repo: Path):
+    sub = repo / "sub dir"
+    sub.mkdir()
+    (sub / "a b.py").write_text("# FIXME: nested\n")
+    (repo / "outside.py").write_text("# FIXME: outside\n")
+    git(repo, "add", "-A")
+
+    assert staged_additions(sub) == {"a b.py": [(1, b"# FIXME: nested")]}
+
+
+def test_staged_additions_nothing_staged(repo: Path):
+    (repo / "keep.py").write_text("a = 1\n# TODO: unstaged\n")
+    assert staged_additions(repo) == {}
+
+
+@pytest.mark.parametrize(
+    "option", ["diff.noprefix=true", "diff.mnemonicPrefix=true", "diff.dstPrefix=x/"]
+)
+def test_staged_additions_ignores_prefix_config(repo: Path, option: str):
+    key, value = option.split("=")
+    git(repo, "config", key, value)
+    (repo / "keep.py").write_text("a = 1\n# TODO: appended\n")
+    git(repo, "add", "-A")
+
+    assert staged_additions(repo) == {"keep.py": [(2, b"# TODO: appended")]}
@@ -0,0 +1,234 @@
+"""Thin wrappers around the git command line."""
+
+import codecs
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class GitError(RuntimeError):
+    pass
+
+
+def run_git(workspace: Path, *args: str) -> bytes:
+    """Run git in workspace and return its stdout; raise GitError on failure."""
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(workspace), *args], capture_output=True
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed") from None
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip()
+        raise GitError(f"git {args[0]} failed: {message}")
+    return result.stdout
+
+
+def show_prefix(workspace: Path) -> str:
+    """Path of workspace inside its repository, "" or ending in "/"."""
+    return run_git(workspace, "rev-parse", "--show-prefix").decode().strip()
+
+
+def _split_paths(output: bytes) -> List[str]:
+    """Paths from -z output, with the platform's separator like Path relative_to."""
+    return [
+        os.fsdecode(path).replace("/", os.sep) for path in output.split(b"\0") if path
+    ]
+
+
+def changed_files(workspace: Path, ref: str) -> List[str]:
+    """Files under workspace that differ from the merge-base with ref, plus untracked ones.
+
+    Paths are relative to workspace. Committed, staged and unstaged changes all
+    count; deleted files are left out.
+    """
+    base = run_git(workspace, "merge-base", ref, "HEAD").decode().strip()
+    changed = run_git(
+        workspace,
+        "diff",
+        "--name-only",
+        "-z",
+        "--relative",
+        "--diff-filter=ACMRT",
+        base,
+    )
+    untracked = run_git(workspace, "ls-files", "-z", "--others", "--exclude-standard")
+    return sorted(set(_split_paths(changed)) | set(_split_paths(untracked)))
+
+
+def _diff_path(header: bytes) -> Optional[str]:
+    """Path from a "+++ b/path" line; None for deletions (/dev/null)."""
+    path = header[4:].rstrip(b"\r\n")
+    # git ends the header with a TAB when the name contains a space
+    if path.endswith(b"\t"):
+        path = path[:-1]
+    if path == b"/dev/null":
+        return None
+    if path.startswith(b'"'):
+        # Names with control characters stay C-quoted even with quotePath off
+        path = codecs.escape_decode(path[1:-1])[0]
+    return os.fsdecode(path[2:]).replace("/", os.sep)
+
+
+def staged_additions(workspace: Path) -> Dict[str, List[Tuple[int, bytes]]]:
+    """Lines added in the index relative to HEAD, per file under workspace.
+
+    Maps relative path -> [(line number in the staged file, line content)]. Uses
+    a zero-context diff: multiline comment state is recovered from the staged
+    blob (see read_staged_blobs), which hunk context alone cannot provide.
+    """
+    diff = run_git(
+        workspace,
+        "-c",
+        "core.quotePath=false",
+        "diff",
+        "--cached",
+        "-U0",
+        "--relative",
+        "--find-renames",
+        "--no-color",
+        "--no-ext-diff",
+        # _diff_path strips "b/"; override diff.noprefix, diff.mnemonicPrefix, ...
+        "--src-prefix=a/",
+        "--dst-prefix=b/",
+    )
+    additions: Dict[str, List[Tuple[int, bytes]]] = {}
+    added = None
+    line_num = 0
+    in_header = False
+    for line in diff.split(b"\n"):
+        if line.startswith(b"diff --git "):
+            in_header = True
+            added = None
+        elif in_header and line.startswith(b"+++ "):
+            path = _diff_path(line)
+            added = None if path is None else additions.setdefault(path, [])
+        elif line.startswith(b"@@ "):
+            in_header = False
+            # @@ -old[,count] +new[,count] @@
+            new_range = line.split(b" ", 3)[2]
+            line_num = int(new_range[1:].split(b",")[0])
+        elif not in_header and added is not None and line.startswith(b"+"):
+            added.append((line_num, line[1:]))
+            line_num += 1
+    return {path: lines for path, lines in additions.items() if lines}
+
+
+def read_staged_blobs(workspace: Path, rel_paths: Iterable[str]) -> Dict[str, bytes]:
+    """Staged content of rel_paths, read with a single git cat-file --batch."""
+    rel_paths = list(rel_paths)
+    if not rel_paths:
+        return {}
+    prefix = show_prefix(workspace)
+    request = b"".join(
+        os.fsencode(":" + prefix + rel_path.replace(os.sep, "/")) + b"\n"
+        for rel_path in rel_paths
+    )
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(workspace), "cat-file", "--batch"],
+            input=request,
+            capture_output=True,
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed") from None
+    if result.returncode != 0:
+        raise GitError(f"git cat-file failed: {result.stderr.decode().strip()}")
+
+    blobs = {}
+    output = result.stdout
+    offset = 0
+    for rel_path in rel_paths:
+        header_end = output.index(b"\n", offset)
+        header = output[offset:header_end].split()
+        offset = header_end + 1
+        if header[-1] == b"missing":
+            continue
+        size = int(header[2])
+        blobs[rel_path] = output[offset : offset + size]
+        offset += size + 1  # Content is followed by a newline
+    return blobs
+
+
+def rev_list(workspace: Path, rev_range: str) -> List[str]:
+    """Commits of rev_range (e.g. "v1.0..main"), parents before children."""
+    output = run_git(
+        workspace, "rev-list", "--reverse", "--topo-order", rev_range, "--"
+    )
+    return output.decode().split()
+
+
+class CatFile:
+    """A long-running git cat-file --batch, reading one object per round trip.
+
+    Unlike read_staged_blobs, which sends every request up front, the next
+    object can depend on the previous one (commit -> tree -> subtree -> blob).
+    """
+
+    def __init__(self, workspace: Path):
+        try:
+            self.process = subprocess.Popen(
+                ["git", "-C", str(workspace), "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            raise GitError("git is not installed") from None
+
+    def read(self, name: str) -> Optional[Tuple[bytes, bytes]]:
+        """(object type, content) of name, or None if it does not exist."""
+        stdin, stdout = self.process.stdin, self.process.stdout
+        stdin.write(name.encode() + b"\n")
+        stdin.flush()
+        header = stdout.readline().split()
+        if not header:
+            raise GitError("git cat-file exited unexpectedly")
+        if header[-1] == b"missing":
+            return None
+        data = stdout.read(int(header[2]))
+        stdout.read(1)  # Content is followed by a newline
+        return header[1], data
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait()
+        self.process.stdout.close()
+
+    def __enter__(self) -> "CatFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def parse_tree(data: bytes) -> Iterator[Tuple[bytes, str, str]]:
+    """(mode, name, object id) of each entry of a raw tree object."""
+    offset = 0
+    while offset < len(data):
+        space = data.index(b" ", offset)
+        nul = data.index(b"\0", space)
+        yield (
+            data[offset:space],
+            os.fsdecode(data[space + 1 : nul]),
+            data[nul + 1 : nul + 21].hex(),
+        )
+        offset = nul + 21
+
+
+def parse_commit(data: bytes) -> Tuple[str, List[str], int, str]:
+    """(tree, parents, committer time, subject) of a raw commit object."""
+    headers, _, message = data.partition(b"\n\n")
+    tree, parents, timestamp = "", [], 0
+    for line in headers.split(b"\n"):
+        key, _, value = line.partition(b" ")
+        if key == b"tree":
+            tree = value.decode()
+        elif key == b"parent":
+            parents.append(value.decode())
+        elif key == b"committer":
+            # Name <email> 1700000000 +0100
+            timestamp = int(value.rsplit(b" ", 2)[1])
+    subject = message.split(b"\n", 1)[0].decode("utf-8", "replace")
+    return tree, parents, timestamp, subject
@@ -0,0 +1,326 @@
+"""Watch mode: keep per-file results in memory and rescan only what changed.
+
+Changes come from Linux inotify, called through ctypes, or from polling the
+candidate files' stat() where inotify is unavailable. Watchers report the
+absolute paths that changed, or None when they lost track (inotify queue
+overflow) and everything must be resynchronised.
+"""
+
+import ctypes
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+
+import config
+from records import Comment, walk_order
+
+if TYPE_CHECKING:
+    from main import CommentScanner
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_ONLYDIR
+)
+# struct inotify_event {int wd; uint32_t mask, cookie, len; char name[];}
+_EVENT = struct.Struct("iIII")
+
+Changes = Optional[Set[str]]
+
+
+class InotifyWatcher:
+    """One inotify watch per directory of the tree, added as directories appear."""
+
+    def __init__(self, root: Path, want_dir: Callable[[str], bool]):
+        libc = ctypes.CDLL(None, use_errno=True)
+        # AttributeError here means the C library has no inotify (not Linux)
+        self._init = libc.inotify_init1
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = self._init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.root = str(root)
+        self.want_dir = want_dir
+        # Watch descriptor -> absolute directory path
+        self.dirs: Dict[int, str] = {}
+        self.watch_tree(self.root, "")
+
+    def watch_tree(self, path: str, rel_dir: str) -> List[str]:
+        """Watch path and its wanted subdirectories; return the files found below it."""
+        files = []
+        stack = [(path, rel_dir)]
+        while stack:
+            dir_path, rel_dir = stack.pop()
+            wd = self._add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                # ENOSPC: out of watches (fs.inotify.max_user_watches)
+                if errno == 28:
+                    raise OSError(errno, os.strerror(errno))
+                continue  # The directory vanished or can't be read
+            self.dirs[wd] = dir_path
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                rel_path = rel_dir + entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if not is_dir:
+                    files.append(entry.path)
+                elif self.want_dir(rel_path + "/"):
+                    stack.append((entry.path, rel_path + "/"))
+        return files
+
+    def wait(self, timeout: Optional[float]) -> Changes:
+        """Block up to timeout seconds (forever if None) for changes."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changes: Set[str] = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changes
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                dir_path = self.dirs.get(wd)
+                if dir_path is None or not name:
+                    continue
+                path = os.path.join(dir_path, name)
+                changes.add(path)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    rel_dir = os.path.relpath(path, self.root).replace(os.sep, "/")
+                    if not name.startswith(".") and self.want_dir(rel_dir + "/"):
+                        # Files created before the watch was added
+                        changes.update(self.watch_tree(path, rel_dir + "/"))
+
+    def rewatch(self) -> None:
+        """Watch directories that became wanted, e.g. after a .gitignore change."""
+        self.watch_tree(self.root, "")
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Compares stat() snapshots of the candidate files every interval seconds."""
+
+    def __init__(self, snapshot: Callable[[], Dict[str, Tuple[int, int]]], interval):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.previous = snapshot()
+
+    def wait(self, timeout: Optional[float]) -> Changes:
+        while True:
+            time.sleep(
+                self.interval if timeout is None else min(timeout, self.interval)
+            )
+            current = self.snapshot()
+            changes = {
+                path
+                for path in self.previous.keys() | current.keys()
+                if self.previous.get(path) != current.get(path)
+            }
+            self.previous = current
+            if changes or timeout is not None:
+                return changes
+
+    def rewatch(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class WatchSession:
+    """Per-file comments of a workspace, kept current from change notifications."""
+
+    def __init__(
+        self,
+        scanner: "CommentScanner",
+        filename_filter: str = None,
+        case_sensitive: bool = True,
+        complete_match: bool = False,
+        on_error: Callable[[Path, str], None] = None,
+    ):
+        self.scanner = scanner
+        self.filename_filter = filename_filter
+        self.case_sensitive = case_sensitive
+        self.complete_match = complete_match
+        self.on_error = on_error
+        self.gitignore_path = str(scanner.workspace_path / ".gitignore")
+        # Relative path -> comments, for every candidate file
+        self.results: Dict[str, List[Comment]] = {}
+
+    def want_dir(self, rel_dir: str) -> bool:
+        return not self.scanner.exclude_patterns.match_file(rel_dir)
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """(mtime_ns, size) of every candidate file and of .gitignore."""
+        stats = {}
+        paths = self.scanner.iter_files(
+            self.filename_filter, self.case_sensitive, self.complete_match
+        )
+        for path in [*map(str, paths), self.gitignore_path]:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def scan(self) -> Dict[str, Optional[List[Comment]]]:
+        """Rescan the whole workspace and return the files whose comments changed.
+
+        The scanner's MemoryCache (if any) keeps this cheap: only files whose
+        stat changed are read again.
+        """
+        scanner = self.scanner
+        results = {}
+        for file_path, comments, error in scanner._scan_results(
+            self.filename_filter,
+            self.case_sensitive,
+            self.complete_match,
+            self.on_error,
+        ):
+            if error is not None:
+                if self.on_error is not None:
+                    self.on_error(file_path, error)
+                continue
+            results[scanner._relative(file_path)] = comments
+
+        # Files without comments only count as changed if they used to have some
+        updated = {
+            rel_path: comments
+            for rel_path, comments in results.items()
+            if self.results.get(rel_path, []) != comments
+        }
+        updated.update(
+            (rel_path, None)
+            for rel_path in self.results.keys() - results
+            if self.results[rel_path]
+        )
+        self.results = results
+        scanner._line_indexes.clear()
+        return updated
+
+    def apply(self, changes: Changes) -> Dict[str, Optional[List[Comment]]]:
+        """Rescan changed files.
+
+        Returns rel path -> new comments, or None for files whose comments are gone
+        because the file was removed or is no longer a candidate.
+        """
+        scanner = self.scanner
+        if changes is None or self.gitignore_path in changes:
+            scanner.exclude_patterns = scanner._load_gitignore()
+            return self.scan()
+
+        updated = {}
+        for path in changes:
+            rel_path = os.path.relpath(path, scanner.workspace_path)
+            if rel_path.startswith(".."):
+                continue
+            scanner._line_indexes.pop(rel_path, None)
+            if os.path.isfile(path) and self._is_candidate(Path(path)):
+                try:
+                    comments = scanner.scan_file(Path(path))
+                except Exception as e:
+                    if self.on_error is not None:
+                        self.on_error(Path(path), str(e))
+                    comments = None
+                if comments is not None:
+                    if self.results.get(rel_path, []) != comments:
+                        updated[rel_path] = comments
+                    self.results[rel_path] = comments
+                    continue
+            # Deleted, moved away, no longer a candidate, or a removed directory
+            prefix = rel_path + os.sep
+            for known in [
+                known
+                for known in self.results
+                if known == rel_path or known.startswith(prefix)
+            ]:
+                if self.results.pop(known):
+                    updated[known] = None
+        return updated
+
+    def _is_candidate(self, path: Path) -> bool:
+        scanner = self.scanner
+        return path.suffix[1:] in scanner.file_extensions and not (
+            scanner.should_skip_path(
+                path, self.filename_filter, self.case_sensitive, self.complete_match
+            )
+        )
+
+    def comments(self) -> List[Comment]:
+        """Every comment, files in the order the workspace walk visits them."""
+        return [
+            comment
+            for rel_path in sorted(self.results, key=walk_order)
+            for comment in self.results[rel_path]
+        ]
+
+
+def open_watcher(session: WatchSession, on_fallback: Callable[[str], None] = None):
+    """An InotifyWatcher where possible, otherwise a PollingWatcher."""
+    try:
+        return InotifyWatcher(session.scanner.workspace_path, session.want_dir)
+    except (AttributeError, OSError) as e:
+        if on_fallback is not None:
+            on_fallback(
+                f"inotify unavailable ({e}); polling every "
+                f"{config.WATCH_POLL_INTERVAL:g} s"
+            )
+        return PollingWatcher(session.snapshot, config.WATCH_POLL_INTERVAL)
+
+
+def wait_for_changes(watcher, debounce: float) -> Changes:
+    """Block until something changes, then collect until debounce seconds pass quietly."""
+    changes = watcher.wait(None)
+    while changes is None or changes:
+        more = watcher.wait(debounce)
+        if more is not None and not more:
+            break
+        if changes is None or more is None:
+            changes = None
+        else:
+            changes |= more
+    return changes